@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import nullcontext
+from itertools import islice
+
+from profiling import Profiler, span
+from run import generate_set_board, is_winning_state
+from solver import escape_order
+
+
+# The first bytes of a corpus file (corpus.MAGIC), kept here so that reading a JSONL file
+# never loads corpus.py and NumPy
+CORPUS_MAGIC = b"PJAM"
+
+
+def load_boards(path):
+    """
+    Read boards from a JSONL file, one {"size", "car_list", "barrier_list"} object per line,
+    or from a binary corpus written by corpus.py.
+    """
+    with open(path, "rb") as f:
+        binary = f.read(len(CORPUS_MAGIC)) == CORPUS_MAGIC
+    if binary:
+        from corpus import CorpusReader
+        with CorpusReader(path) as reader:
+            yield from reader
+        return
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                board = json.loads(line)
+                yield {
+                    "size": board["size"],
+                    "car_list": [tuple(car) for car in board["car_list"]],
+                    "barrier_list": [tuple(barrier) for barrier in board["barrier_list"]],
+                }
+
+
+def evaluate_board(index, board, profile=False, use_sat=False):
+    """
+    Check a single board and return its result record.
+    A board is winnable when the theory is satisfiable and every car can actually leave.
+    With profile set, the record also holds the board's spans and counters under "metrics".
+    """
+    profiler = Profiler()
+    start = time.perf_counter()
+    with profiler if profile else nullcontext():
+        grid_size = board["size"]
+        grid, cars, barriers = generate_set_board(grid_size, board["car_list"], board["barrier_list"])
+
+        winnable = is_winning_state(grid_size, cars, barriers, verbose=False, use_sat=use_sat)
+        with span("escape_order"):
+            moves, stuck = escape_order(grid, [car.car_id for car in cars])
+
+    record = {
+        "board": index,
+        "size": grid_size,
+        "winnable": winnable and not stuck,
+        "moves": moves if not stuck else [],
+        "seconds": time.perf_counter() - start,
+    }
+    if profile:
+        record["metrics"] = profiler.record()
+    return record
+
+
+def _evaluate(chunk):
+    return [evaluate_board(*item) for item in chunk]
+
+
+def run_batch(boards, workers=None, chunksize=1, profile=False, use_sat=False):
+    """
+    Evaluate many boards across a process pool, chunksize boards per task.
+    Records are yielded in input order as soon as they are ready. Only about
+    workers * chunksize * 2 boards are read ahead of the last record yielded, so a huge
+    input file is never held in memory at once.
+    """
+    # Only batch runs pay for the process pool machinery, not load_boards callers
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    items = ((index, board, profile, use_sat) for index, board in enumerate(boards))
+    chunks = iter(lambda: list(islice(items, chunksize)), [])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_evaluate, chunk) for chunk in islice(chunks, workers * 2))
+        while pending:
+            records = pending.popleft().result()
+            # Top the window up before handing the records over
+            for chunk in islice(chunks, 1):
+                pending.append(pool.submit(_evaluate, chunk))
+            yield from records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check many parking jam boards in parallel.")
+    parser.add_argument("boards", nargs="?", help="JSONL or corpus file of boards (defaults to the examples)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=1, help="boards sent to a worker at a time")
+    parser.add_argument("--sat", action="store_true", help="decide each board with the SAT theory")
+    parser.add_argument("--profile", action="store_true", help="add per-stage timings and counters to each record")
+    args = parser.parse_args()
+
+    if not args.boards:
+        from examples import examples
+    boards = load_boards(args.boards) if args.boards else examples
+    for record in run_batch(boards, args.workers, args.chunksize, args.profile, args.sat):
+        print(json.dumps(record))
+        sys.stdout.flush()
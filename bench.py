@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import platform
+import time
+from contextlib import redirect_stdout
+
+from run import generate_random_board, generate_set_board, board_theory, is_winning_state, display_solution
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_case(size, num_cars, num_barriers, seed=0, sat=True, compact=False):
+    """
+    Time every stage of checking one random board, from generation to playing back the solution.
+    Returns a record with the seconds spent in each stage and the size of the compiled theory.
+    """
+    seconds = {}
+    record = {"size": size, "cars": num_cars, "barriers": num_barriers, "seed": seed, "seconds": seconds}
+
+    (grid, cars, barriers), seconds["generate_random_board"] = timed(
+        generate_random_board, size, num_cars, num_barriers, seed)
+
+    car_list = [(car.car_id, car.x, car.y, car.orientation) for car in cars]
+    barrier_list = [(barrier.x, barrier.y) for barrier in barriers]
+    _, seconds["generate_set_board"] = timed(generate_set_board, size, car_list, barrier_list)
+
+    record["winnable"], seconds["is_winning_state"] = timed(is_winning_state, size, cars, barriers, False)
+
+    if sat:
+        T, seconds["board_theory"] = timed(board_theory, size, cars, barriers, compact)
+        T, seconds["compile"] = timed(T.compile)
+        record["nodes"] = T.size()
+        record["vars"] = len(T.vars())
+        record["compact"] = compact
+        satisfiable, seconds["satisfiable"] = timed(T.satisfiable)
+        if satisfiable:
+            _, seconds["solve"] = timed(T.solve)
+
+    # Play the solution back without paying for the terminal
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        _, seconds["display_solution"] = timed(display_solution, grid, list(cars), barriers, size)
+
+    return record
+
+
+def best_of(records):
+    """
+    Keep the fastest time of each stage over repeated runs of the same board.
+    """
+    best = dict(records[0])
+    best["seconds"] = {stage: min(r["seconds"][stage] for r in records) for stage in records[0]["seconds"]}
+    return best
+
+
+def sweep(sizes, car_densities, barrier_densities, repeat=3, sat_limit=40, seed=0, compact=False):
+    """
+    Run every combination of grid size, car density and barrier density.
+    Densities are fractions of the cells; the SAT stages are skipped above sat_limit.
+    """
+    for size in sizes:
+        for car_density in car_densities:
+            for barrier_density in barrier_densities:
+                num_cars = max(1, int(size * size * car_density))
+                num_barriers = int(size * size * barrier_density)
+                if num_cars + num_barriers > size * size:
+                    continue
+                records = [bench_case(size, num_cars, num_barriers, seed, size <= sat_limit, compact)
+                           for _ in range(repeat)]
+                yield best_of(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark each stage of checking parking jam boards.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--car-density", type=float, nargs="+", default=[0.05, 0.2])
+    parser.add_argument("--barrier-density", type=float, nargs="+", default=[0.05, 0.2])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated boards")
+    parser.add_argument("--sat-limit", type=int, default=40, help="largest grid to compile and solve")
+    parser.add_argument("--compact", action="store_true", help="benchmark the compact encoding")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    results = []
+    for record in sweep(args.sizes, args.car_density, args.barrier_density, args.repeat, args.sat_limit, args.seed,
+                        args.compact):
+        results.append(record)
+        stages = ", ".join(f"{stage} {seconds * 1000:.2f}ms" for stage, seconds in record["seconds"].items())
+        print(f"{record['size']}x{record['size']} cars={record['cars']} barriers={record['barriers']}: {stages}")
+
+    with open(args.output, "w") as f:
+        json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,254 @@
+from array import array
+
+EMPTY = 0
+BARRIER = -1
+
+
+def span_cells(x, y, orientation, length):
+    """
+    The cells covered by a car with its top-left cell at (x, y), starting from that cell.
+    """
+    if orientation == 'EW':
+        return [(x + i, y) for i in range(length)]
+    return [(x, y + i) for i in range(length)]
+
+
+class Car:
+    __slots__ = ("car_id", "x", "y", "orientation", "length")
+
+    def __init__(self, car_id, x, y, orientation, length=1):
+        """
+        A car whose top-left cell is (x, y), covering length cells along its orientation.
+        A plain record: the theories create their own propositions when they are built.
+        """
+        self.car_id = car_id
+        self.x = x
+        self.y = y
+        self.orientation = orientation
+        self.length = length
+
+    def cells(self):
+        return span_cells(self.x, self.y, self.orientation, self.length)
+
+    def _key(self):
+        return (self.car_id, self.x, self.y, self.orientation, self.length)
+
+    def __eq__(self, other):
+        return isinstance(other, Car) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        if self.length > 1:
+            return f"Car({self.car_id}, x = {self.x}, y = {self.y}, orientation = {self.orientation}, length = {self.length})"
+        return f"Car({self.car_id}, x = {self.x}, y = {self.y}, orientation = {self.orientation})"
+
+
+class Barrier:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return isinstance(other, Barrier) and (self.x, self.y) == (other.x, other.y)
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __repr__(self):
+        return f"Barrier({self.x}, {self.y})"
+
+
+class Board:
+    __slots__ = ("size", "cells", "rows", "cols", "barrier_rows", "barrier_cols", "positions", "orientations",
+                 "lengths")
+
+    def __init__(self, size):
+        """
+        Occupancy index for a size x size parking jam board.
+        cells is a flat int array indexed by y * size + x holding 0 for an empty cell,
+        -1 for a barrier, or the id of the car parked there. A car of length n covers n cells
+        from its top-left cell (its position) along its orientation, and every one of them
+        holds its id, so the cells double as the span -> car index.
+        rows[y] and cols[x] are bitsets of the occupied cells along each row and column,
+        so checking a whole escape ray is a single mask test.
+        barrier_rows and barrier_cols hold the same bitsets for barriers only.
+        """
+        self.size = size
+        self.cells = array('i', [EMPTY]) * (size * size)
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.barrier_rows = [0] * size
+        self.barrier_cols = [0] * size
+        self.positions = {}
+        self.orientations = {}
+        self.lengths = {}
+
+    def at(self, x, y):
+        return self.cells[y * self.size + x]
+
+    def is_empty(self, x, y):
+        return self.cells[y * self.size + x] == EMPTY
+
+    def _occupy(self, x, y, value):
+        self.cells[y * self.size + x] = value
+        self.rows[y] |= 1 << x
+        self.cols[x] |= 1 << y
+
+    def _vacate(self, x, y):
+        self.cells[y * self.size + x] = EMPTY
+        self.rows[y] &= ~(1 << x)
+        self.cols[x] &= ~(1 << y)
+
+    def span(self, car_id):
+        """
+        Return the cells covered by a car, starting from its top-left cell.
+        """
+        x, y = self.positions[car_id]
+        return span_cells(x, y, self.orientations[car_id], self.lengths[car_id])
+
+    def fits(self, x, y, orientation, length=1):
+        """
+        Whether a car of the given length can be parked with its top-left cell at (x, y).
+        """
+        return all(0 <= cx < self.size and 0 <= cy < self.size and self.is_empty(cx, cy)
+                   for cx, cy in span_cells(x, y, orientation, length))
+
+    def place_car(self, car_id, x, y, orientation, length=1):
+        for cx, cy in span_cells(x, y, orientation, length):
+            self._occupy(cx, cy, car_id)
+        self.positions[car_id] = (x, y)
+        self.orientations[car_id] = orientation
+        self.lengths[car_id] = length
+
+    def place_barrier(self, x, y):
+        self._occupy(x, y, BARRIER)
+        self.barrier_rows[y] |= 1 << x
+        self.barrier_cols[x] |= 1 << y
+
+    def remove_barrier(self, x, y):
+        self._vacate(x, y)
+        self.barrier_rows[y] &= ~(1 << x)
+        self.barrier_cols[x] &= ~(1 << y)
+
+    def remove_car(self, car_id):
+        """
+        Remove a car from the board in O(length).
+        """
+        for x, y in self.span(car_id):
+            self._vacate(x, y)
+        del self.positions[car_id]
+        del self.orientations[car_id]
+        del self.lengths[car_id]
+
+    def _along(self, car_id, direction, rows, cols):
+        """
+        Slice the bits along a car's escape path out of the given row and column bitsets.
+        N is always forwards for NS cars, E is forwards for EW cars.
+        """
+        x, y = self.positions[car_id]
+        if self.orientations[car_id] == 'EW':
+            if direction == "forwards":
+                return rows[y] >> (x + self.lengths[car_id])
+            return rows[y] & ((1 << x) - 1)
+        if direction == "forwards":
+            return cols[x] & ((1 << y) - 1)
+        return cols[x] >> (y + self.lengths[car_id])
+
+    def ray(self, car_id, direction):
+        """
+        Return the bitmask of occupied cells along a car's escape path.
+        """
+        return self._along(car_id, direction, self.rows, self.cols)
+
+    def barrier_ray(self, car_id, direction):
+        """
+        Return the bitmask of barriers along a car's escape path, ignoring other cars.
+        """
+        return self._along(car_id, direction, self.barrier_rows, self.barrier_cols)
+
+    def ray_span(self, car_id, direction):
+        """
+        Return the bitmask with every cell of a car's escape path set.
+        """
+        x, y = self.positions[car_id]
+        start = x if self.orientations[car_id] == 'EW' else y
+        # EW cars drive right when going forwards, NS cars drive up
+        if (direction == "forwards") == (self.orientations[car_id] == 'EW'):
+            return (1 << (self.size - start - self.lengths[car_id])) - 1
+        return (1 << start) - 1
+
+    def path(self, car_id, direction):
+        """
+        Return the cells a car drives over to leave in direction, nearest first.
+        """
+        x, y = self.positions[car_id]
+        length = self.lengths[car_id]
+        if self.orientations[car_id] == 'EW':
+            if direction == "forwards":
+                return [(cx, y) for cx in range(x + length, self.size)]
+            return [(cx, y) for cx in range(x - 1, -1, -1)]
+        if direction == "forwards":
+            return [(x, cy) for cy in range(y - 1, -1, -1)]
+        return [(x, cy) for cy in range(y + length, self.size)]
+
+    def can_escape(self, car_id, direction):
+        return not self.ray(car_id, direction)
+
+    def escape_direction(self, car_id):
+        """
+        Return the direction a car can leave the board in, or None if it is blocked.
+        """
+        if self.can_escape(car_id, "forwards"):
+            return "forwards"
+        if self.can_escape(car_id, "backwards"):
+            return "backwards"
+        return None
+
+    def waiting_on(self, x, y):
+        """
+        Return the ids of the cars whose nearest obstacle is the cell (x, y).
+        These are the only cars that can become free when (x, y) is vacated.
+        """
+        waiting = []
+        row, col = self.rows[y], self.cols[x]
+
+        # Nearest occupied cells to the left and right of (x, y)
+        m = row & ((1 << x) - 1)
+        if m:
+            waiting.append((m.bit_length() - 1, y, 'EW'))
+        m = row >> (x + 1)
+        if m:
+            waiting.append((x + (m & -m).bit_length(), y, 'EW'))
+
+        # Nearest occupied cells above and below (x, y)
+        m = col & ((1 << y) - 1)
+        if m:
+            waiting.append((x, m.bit_length() - 1, 'NS'))
+        m = col >> (y + 1)
+        if m:
+            waiting.append((x, y + (m & -m).bit_length(), 'NS'))
+
+        # Only cars driving along that row or column have the cell on their path
+        cars = []
+        for nx, ny, orientation in waiting:
+            cell = self.at(nx, ny)
+            if cell > 0 and self.orientations[cell] == orientation:
+                cars.append(cell)
+        return cars
+
+    def copy(self):
+        other = Board.__new__(Board)
+        other.size = self.size
+        other.cells = self.cells[:]
+        other.rows = self.rows[:]
+        other.cols = self.cols[:]
+        other.barrier_rows = self.barrier_rows[:]
+        other.barrier_cols = self.barrier_cols[:]
+        other.positions = dict(self.positions)
+        other.orientations = dict(self.orientations)
+        other.lengths = dict(self.lengths)
+        return other
@@ -0,0 +1,117 @@
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+from theory import board_theory
+
+
+# The 8 symmetries of a square grid as (x, y, n) -> (x, y), and whether they swap the axes
+SYMMETRIES = [
+    (lambda x, y, n: (x, y), False),
+    (lambda x, y, n: (n - 1 - y, x), True),
+    (lambda x, y, n: (n - 1 - x, n - 1 - y), False),
+    (lambda x, y, n: (y, n - 1 - x), True),
+    (lambda x, y, n: (n - 1 - x, y), False),
+    (lambda x, y, n: (x, n - 1 - y), False),
+    (lambda x, y, n: (y, x), True),
+    (lambda x, y, n: (n - 1 - y, n - 1 - x), True),
+]
+
+SWAPPED = {'NS': 'EW', 'EW': 'NS'}
+
+
+def _digest(key):
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def board_signature(grid_size, cars, barriers, symmetric=False):
+    """
+    Hash a board from its size, sorted car tuples and sorted barriers.
+    With symmetric set, car ids are dropped and the smallest of the board's 8 rotations
+    and reflections is hashed, so symmetric boards share a signature. That signature is
+    only safe for verdicts; compiled theories name cars by id and cells by position.
+    """
+    if not symmetric:
+        return _digest((grid_size,
+                        tuple(sorted((car.car_id, car.x, car.y, car.orientation, car.length) for car in cars)),
+                        tuple(sorted((barrier.x, barrier.y) for barrier in barriers))))
+
+    forms = []
+    for transform, swaps_axes in SYMMETRIES:
+        placed = []
+        for car in cars:
+            # A longer car's top-left cell is wherever either end of it lands
+            dx, dy = (car.length - 1, 0) if car.orientation == 'EW' else (0, car.length - 1)
+            x, y = min(transform(car.x, car.y, grid_size), transform(car.x + dx, car.y + dy, grid_size))
+            placed.append((x, y, SWAPPED[car.orientation] if swaps_axes else car.orientation, car.length))
+        walls = [transform(barrier.x, barrier.y, grid_size) for barrier in barriers]
+        forms.append((tuple(sorted(placed)), tuple(sorted(walls))))
+    return _digest((grid_size, min(forms)))
+
+
+class TheoryCache:
+    def __init__(self, maxsize=128, path=None, compact=False):
+        """
+        Memoize compiled theories and their verdicts.
+        Compiled theories are kept in an in-memory LRU keyed by the exact board signature.
+        Verdicts are keyed by the symmetric signature and, when path is given, also
+        stored in a SQLite file so later runs can skip compilation entirely.
+        compact selects the encoding that gets compiled; both give the same verdicts.
+        """
+        self.maxsize = maxsize
+        self.compact = compact
+        self.theories = OrderedDict()
+        self.verdicts = OrderedDict()
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS verdicts (signature TEXT PRIMARY KEY, satisfiable INTEGER)")
+
+    def _remember(self, table, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        if len(table) > self.maxsize:
+            table.popitem(last=False)
+
+    def theory(self, grid_size, cars, barriers):
+        """
+        Return the compiled theory for a board, compiling it only on a cache miss.
+        """
+        key = board_signature(grid_size, cars, barriers)
+        if key in self.theories:
+            self.theories.move_to_end(key)
+            return self.theories[key]
+
+        T = board_theory(grid_size, cars, barriers, self.compact).compile()
+        self._remember(self.theories, key, T)
+        return T
+
+    def satisfiable(self, grid_size, cars, barriers):
+        """
+        Return whether the board's theory is satisfiable, looking in memory, then on disk,
+        and only compiling the theory if neither has seen the board or one of its symmetries.
+        """
+        key = board_signature(grid_size, cars, barriers, symmetric=True)
+        if key in self.verdicts:
+            self.verdicts.move_to_end(key)
+            return self.verdicts[key]
+
+        row = None
+        if self.db is not None:
+            row = self.db.execute("SELECT satisfiable FROM verdicts WHERE signature = ?", (key,)).fetchone()
+
+        if row is not None:
+            verdict = bool(row[0])
+        else:
+            verdict = bool(self.theory(grid_size, cars, barriers).satisfiable())
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?)", (key, int(verdict)))
+                self.db.commit()
+
+        self._remember(self.verdicts, key, verdict)
+        return verdict
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,246 @@
+import argparse
+import mmap
+import struct
+
+import numpy as np
+
+from board import Board
+
+# File header: magic, version, board count and where the offset index starts
+HEADER = struct.Struct("<4sHHQQ")
+MAGIC = b"PJAM"
+VERSION = 1
+
+# Each board starts with its grid size and car count, then its car table, then its packed cells
+RECORD = struct.Struct("<HH")
+CAR_DTYPE = np.dtype([("car_id", "<u4"), ("x", "<u2"), ("y", "<u2"), ("orientation", "u1"), ("length", "u1")])
+
+# 2-bit cell codes; which car sits on a cell comes from the car table
+EMPTY, BARRIER, EW, NS = 0, 1, 2, 3
+ORIENTATIONS = ['EW', 'NS']
+
+
+def pack_cells(codes):
+    """
+    Pack a flat array of 2-bit cell codes four to a byte, first cell in the low bits.
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+def unpack_cells(packed, size):
+    """
+    Unpack 2-bit cell codes into a (size, size) uint8 array.
+    """
+    codes = np.stack([(packed >> shift) & 3 for shift in (0, 2, 4, 6)], axis=1).reshape(-1)
+    return codes[:size * size].reshape(size, size)
+
+
+def encode_board(board):
+    """
+    Turn a board in the examples schema into its binary record.
+    Cars that overlap or leave the grid and barriers on taken cells are dropped,
+    the same way generate_set_board drops them.
+    """
+    size = board["size"]
+    grid = Board(size)
+    for car_data in board["car_list"]:
+        car_id, x, y, orientation = car_data[:4]
+        length = car_data[4] if len(car_data) > 4 else 1
+        if grid.fits(x, y, orientation, length):
+            grid.place_car(car_id, x, y, orientation, length)
+    for x, y in board["barrier_list"]:
+        if grid.is_empty(x, y):
+            grid.place_barrier(x, y)
+
+    table = np.zeros(len(grid.positions), dtype=CAR_DTYPE)
+    for i, car_id in enumerate(grid.positions):
+        x, y = grid.positions[car_id]
+        table[i] = (car_id, x, y, ORIENTATIONS.index(grid.orientations[car_id]), grid.lengths[car_id])
+
+    cells = np.array(grid.cells, dtype=np.int64)
+    codes = np.where(cells < 0, BARRIER, EMPTY).astype(np.uint8)
+    for car_id in grid.positions:
+        code = EW if grid.orientations[car_id] == 'EW' else NS
+        for x, y in grid.span(car_id):
+            codes[y * size + x] = code
+
+    return RECORD.pack(size, len(table)) + table.tobytes() + pack_cells(codes).tobytes()
+
+
+class CorpusWriter:
+    def __init__(self, path):
+        """
+        Stream boards into a corpus file. The offset index and the header are written on close.
+        """
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        self.offsets = []
+
+    def add(self, board):
+        self.offsets.append(self.file.tell())
+        self.file.write(encode_board(board))
+
+    def close(self):
+        if self.file is None:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.offsets, dtype="<u8").tobytes())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.offsets), index_offset))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_corpus(path, boards):
+    """
+    Write boards in the examples schema to a corpus file and return how many were written.
+    """
+    with CorpusWriter(path) as writer:
+        for board in boards:
+            writer.add(board)
+        return len(writer.offsets)
+
+
+class CorpusReader:
+    def __init__(self, path):
+        """
+        Memory-map a corpus file. Boards are only decoded when asked for, and the car table
+        and packed cells of a board are NumPy views straight into the mapping.
+        """
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, index_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a board corpus")
+        if version != VERSION:
+            raise ValueError(f"{path} has corpus version {version}, expected {VERSION}")
+        self.offsets = np.frombuffer(self.map, dtype="<u8", count=count, offset=index_offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _record(self, i):
+        offset = int(self.offsets[i])
+        size, num_cars = RECORD.unpack_from(self.map, offset)
+        return size, num_cars, offset + RECORD.size
+
+    def size(self, i):
+        return self._record(i)[0]
+
+    def car_table(self, i):
+        """
+        Return the cars of board i as a structured array view (car_id, x, y, orientation, length),
+        with orientation 0 for EW and 1 for NS.
+        """
+        _, num_cars, start = self._record(i)
+        return np.frombuffer(self.map, dtype=CAR_DTYPE, count=num_cars, offset=start)
+
+    def packed_cells(self, i):
+        """
+        Return the packed 2-bit cells of board i as a uint8 view.
+        """
+        size, num_cars, start = self._record(i)
+        return np.frombuffer(self.map, dtype=np.uint8, count=-(-size * size // 4),
+                             offset=start + num_cars * CAR_DTYPE.itemsize)
+
+    def cells(self, i):
+        """
+        Return the 2-bit cell codes of board i as a (size, size) array.
+        """
+        return unpack_cells(self.packed_cells(i), self.size(i))
+
+    def grid(self, i):
+        """
+        Return board i in the cell encoding used by vectorized.stack_boards:
+        0 empty, -1 barrier, or the id of the car on the cell.
+        """
+        codes = self.cells(i)
+        grid = np.where(codes == BARRIER, -1, 0).astype(np.int32)
+        for car_id, x, y, orientation, length in self.car_table(i).tolist():
+            if orientation == 0:
+                grid[y, x:x + length] = car_id
+            else:
+                grid[y:y + length, x] = car_id
+        return grid
+
+    def stack(self, indices=None):
+        """
+        Stack boards of one grid size into the (grids, orientations) arrays that
+        vectorized.escapability and vectorized.peel take, without building Board objects.
+        """
+        indices = range(len(self)) if indices is None else indices
+        if len({self.size(i) for i in indices}) > 1:
+            raise ValueError("Only boards of the same size can be stacked")
+        tables = [self.car_table(i) for i in indices]
+        max_id = max((int(table["car_id"].max()) for table in tables if len(table)), default=0)
+        dtype = np.int8 if max_id <= np.iinfo(np.int8).max else np.int32
+
+        grids = np.stack([self.grid(i) for i in indices]).astype(dtype)
+        orientations = np.zeros((len(tables), max_id + 1), dtype=np.int8)
+        for n, table in enumerate(tables):
+            orientations[n, table["car_id"]] = table["orientation"]
+        return grids, orientations
+
+    def __getitem__(self, i):
+        """
+        Decode board i into the examples schema.
+        """
+        codes = self.cells(i)
+        car_list = []
+        for car_id, x, y, orientation, length in self.car_table(i).tolist():
+            car = (car_id, x, y, ORIENTATIONS[orientation])
+            car_list.append(car + (length,) if length > 1 else car)
+        barrier_list = [(int(x), int(y)) for y, x in zip(*np.nonzero(codes == BARRIER))]
+        return {"size": self.size(i), "car_list": car_list, "barrier_list": barrier_list}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if self.map is not None:
+            self.offsets = None
+            try:
+                self.map.close()
+            except BufferError:
+                # Views the caller still holds keep the mapping open until they are gone
+                pass
+            self.file.close()
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_corpus(path):
+    """
+    Load every board of a corpus file in the examples schema.
+    """
+    with CorpusReader(path) as reader:
+        return list(reader)
+
+
+if __name__ == "__main__":
+    from batch import load_boards
+    from examples import examples
+
+    parser = argparse.ArgumentParser(description="Convert boards to the binary corpus format.")
+    parser.add_argument("output", help="corpus file to write")
+    parser.add_argument("boards", nargs="?", help="JSONL file of boards (defaults to the examples)")
+    args = parser.parse_args()
+
+    count = write_corpus(args.output, load_boards(args.boards) if args.boards else examples)
+    print(f"Wrote {count} boards to {args.output}")
@@ -0,0 +1,139 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board, Car, Barrier
+from solver import escape_order
+
+
+def _line(board, car_id):
+    # Rows are lines 0 .. size - 1 and columns size .. 2 * size - 1
+    x, y = board.positions[car_id]
+    return y if board.orientations[car_id] == 'EW' else board.size + x
+
+
+def components(board, through_cars=True, barrier_cells=None):
+    """
+    Group the cars into independent parts of the board.
+    Every car drives along one row or column (its line). A car can only be held up by what
+    sits on its own line, so a car joins its line to each line its cells cross that some
+    other car drives along. Boards in different groups can never affect each other.
+    With through_cars off only the barriers count, as in example_theory, and every line
+    is a group of its own.
+    barrier_cells defaults to the barriers on the board.
+    Returns a list of (car_ids, barrier_cells), each barrier going with the lines it is on.
+    """
+    size = board.size
+    parent = list(range(2 * size))
+
+    def find(line):
+        while parent[line] != line:
+            parent[line] = parent[parent[line]]
+            line = parent[line]
+        return line
+
+    driven = {_line(board, car_id) for car_id in board.positions}
+    if through_cars:
+        for car_id in board.positions:
+            line = _line(board, car_id)
+            for x, y in board.span(car_id):
+                crossing = size + x if line < size else y
+                if crossing in driven:
+                    parent[find(crossing)] = find(line)
+
+    groups = {}
+    for car_id in board.positions:
+        groups.setdefault(find(_line(board, car_id)), ([], []))[0].append(car_id)
+    if barrier_cells is None:
+        barrier_cells = [(i % size, i // size) for i, value in enumerate(board.cells) if value < 0]
+    for x, y in barrier_cells:
+        # A barrier matters to the cars on its row and on its column, which may be in two groups
+        for root in {find(line) for line in (y, size + x) if line in driven}:
+            groups[root][1].append((x, y))
+    return list(groups.values())
+
+
+def split_board(board, through_cars=True):
+    """
+    Build one board per independent group, each the size of the original.
+    """
+    parts = []
+    for car_ids, barrier_cells in components(board, through_cars):
+        part = Board(board.size)
+        for car_id in car_ids:
+            x, y = board.positions[car_id]
+            part.place_car(car_id, x, y, board.orientations[car_id], board.lengths[car_id])
+        for x, y in barrier_cells:
+            part.place_barrier(x, y)
+        parts.append(part)
+    return parts
+
+
+def _escape_order(item):
+    part, order = item
+    return escape_order(part, order)
+
+
+def escape_order_split(board, order=None, workers=None):
+    """
+    escape_order worked out group by group, optionally across a process pool.
+    The greedy peel always takes the earliest ready car in order, and the groups cannot
+    free each other's cars, so merging the groups' move lists by the rank of their next car
+    gives exactly the moves escape_order gives for the whole board.
+    """
+    if order is None:
+        order = list(board.positions)
+    rank = {car_id: i for i, car_id in enumerate(order)}
+    parts = split_board(board)
+    items = [(part, [car_id for car_id in order if car_id in part.positions]) for part in parts]
+    if workers and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_escape_order, items))
+    else:
+        results = [_escape_order(item) for item in items]
+
+    heads = [(rank[moves[0][0]], i, 0) for i, (moves, _) in enumerate(results) if moves]
+    heapq.heapify(heads)
+    moves = []
+    while heads:
+        _, i, j = heapq.heappop(heads)
+        part_moves = results[i][0]
+        moves.append(part_moves[j])
+        if j + 1 < len(part_moves):
+            heapq.heappush(heads, (rank[part_moves[j + 1][0]], i, j + 1))
+
+    stuck = sorted((car_id for _, part_stuck in results for car_id in part_stuck), key=rank.get)
+    return moves, stuck
+
+
+def _theory_verdict(item):
+    from theory import solve_theory
+    grid_size, cars, barriers, compact = item
+    return solve_theory(grid_size, cars, barriers, compact)[0]
+
+
+def theory_verdict_split(grid_size, cars, barriers, compact=True, workers=None):
+    """
+    Decide board_theory one line at a time, so each compile only holds the constraints of
+    one row or column and the cost follows the largest group rather than the whole board.
+    The compact encoding is the default since the full one repeats every cell's Empty rule
+    in each group. The board is winnable only if every group is; without workers the
+    smallest groups go first and the first unwinnable one ends the search.
+    """
+    board = Board(grid_size)
+    for car in cars:
+        board.place_car(car.car_id, car.x, car.y, car.orientation, car.length)
+    # The barriers stay out of the board so that each keeps its fact even on a car's cell
+    groups = components(board, through_cars=False, barrier_cells=[(barrier.x, barrier.y) for barrier in barriers])
+
+    items = []
+    for car_ids, barrier_cells in sorted(groups, key=lambda group: len(group[0])):
+        part_cars = []
+        for car_id in car_ids:
+            x, y = board.positions[car_id]
+            part_cars.append(Car(car_id, x, y, board.orientations[car_id], board.lengths[car_id]))
+        items.append((grid_size, part_cars, [Barrier(x, y) for x, y in barrier_cells], compact))
+
+    if workers and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return all(pool.map(_theory_verdict, items))
+    return all(_theory_verdict(item) for item in items)
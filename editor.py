@@ -0,0 +1,145 @@
+from board import Board, Car, Barrier, BARRIER
+from solver import escape_order
+
+
+class BoardEditor:
+    def __init__(self, size, cars=(), barriers=()):
+        """
+        A board that can be edited in place, for the level editor.
+        Besides the occupancy index it keeps, for every row, the EW cars in it and, for every
+        column, the NS cars in it. A change to a cell can only affect the cars driving along
+        its row or column, so only those are re-checked. The winnable verdict and exit order
+        are worked out when first asked for and kept until an edit can change them.
+        """
+        self.board = Board(size)
+        self.row_cars = [set() for _ in range(size)]
+        self.col_cars = [set() for _ in range(size)]
+        # The direction each car can leave in right now, or None while it is blocked
+        self.free = {}
+        self._verdict = None
+        self._solution = None
+        for car in cars:
+            self.add_car(car.car_id, car.x, car.y, car.orientation, car.length)
+        for barrier in barriers:
+            self.add_barrier(barrier.x, barrier.y)
+
+    @property
+    def size(self):
+        return self.board.size
+
+    def _on_board(self, x, y):
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            raise ValueError(f"({x}, {y}) is off the board")
+
+    def _refresh(self, cells, keep=None):
+        """
+        Re-check the cars along the rows and columns of the changed cells. keep is the
+        verdict that this kind of edit cannot change, if any: more obstacles never make an
+        unwinnable board winnable, and fewer never make a winnable one unwinnable.
+        """
+        board = self.board
+        for y in {y for _, y in cells}:
+            for car_id in self.row_cars[y]:
+                self.free[car_id] = board.escape_direction(car_id)
+        for x in {x for x, _ in cells}:
+            for car_id in self.col_cars[x]:
+                self.free[car_id] = board.escape_direction(car_id)
+        if self._verdict is not keep:
+            self._verdict = None
+        self._solution = None
+
+    def add_barrier(self, x, y):
+        self._on_board(x, y)
+        if not self.board.is_empty(x, y):
+            raise ValueError(f"({x}, {y}) is not empty")
+        self.board.place_barrier(x, y)
+        self._refresh([(x, y)], keep=False)
+
+    def remove_barrier(self, x, y):
+        self._on_board(x, y)
+        if self.board.at(x, y) != BARRIER:
+            raise ValueError(f"There is no barrier at ({x}, {y})")
+        self.board.remove_barrier(x, y)
+        self._refresh([(x, y)], keep=True)
+
+    def add_car(self, car_id, x, y, orientation, length=1):
+        if car_id in self.board.positions:
+            raise ValueError(f"Car {car_id} is already on the board")
+        if car_id <= 0:
+            raise ValueError("Car ids must be positive")
+        if not self.board.fits(x, y, orientation, length):
+            raise ValueError(f"Car {car_id} does not fit at ({x}, {y})")
+        self.board.place_car(car_id, x, y, orientation, length)
+        if orientation == 'EW':
+            self.row_cars[y].add(car_id)
+        else:
+            self.col_cars[x].add(car_id)
+        self._refresh(self.board.span(car_id), keep=False)
+
+    def remove_car(self, car_id):
+        if car_id not in self.board.positions:
+            raise ValueError(f"Car {car_id} is not on the board")
+        x, y = self.board.positions[car_id]
+        cells = self.board.span(car_id)
+        if self.board.orientations[car_id] == 'EW':
+            self.row_cars[y].discard(car_id)
+        else:
+            self.col_cars[x].discard(car_id)
+        self.board.remove_car(car_id)
+        del self.free[car_id]
+        self._refresh(cells, keep=True)
+
+    def move_car(self, car_id, x, y, orientation=None, length=None):
+        """
+        Move a car to a new top-left cell, optionally turning or resizing it.
+        The car stays where it was if it does not fit at the new place.
+        """
+        old = self.car(car_id)
+        orientation = orientation or old.orientation
+        length = length or old.length
+        self.remove_car(car_id)
+        try:
+            self.add_car(car_id, x, y, orientation, length)
+        except ValueError:
+            self.add_car(car_id, old.x, old.y, old.orientation, old.length)
+            raise
+
+    def car(self, car_id):
+        x, y = self.board.positions[car_id]
+        return Car(car_id, x, y, self.board.orientations[car_id], self.board.lengths[car_id])
+
+    @property
+    def cars(self):
+        return [self.car(car_id) for car_id in self.board.positions]
+
+    @property
+    def barriers(self):
+        size = self.size
+        return [Barrier(i % size, i // size) for i, value in enumerate(self.board.cells) if value == BARRIER]
+
+    def movable(self):
+        """
+        The cars that can leave right now, kept up to date edit by edit.
+        """
+        return [car_id for car_id, direction in self.free.items() if direction]
+
+    def solution(self):
+        """
+        Return (moves, stuck) as escape_order does, in the order the cars were added.
+        """
+        if self._solution is None:
+            if self.free and not any(self.free.values()):
+                # Nobody can move, so there is nothing to peel
+                self._solution = [], list(self.board.positions)
+            else:
+                self._solution = escape_order(self.board)
+            self._verdict = not self._solution[1]
+        return self._solution
+
+    def exit_order(self):
+        return self.solution()[0]
+
+    def winnable(self):
+        if self._verdict is None:
+            self.solution()
+        return self._verdict
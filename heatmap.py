@@ -0,0 +1,48 @@
+import argparse
+
+from nnf import Var
+
+import lib204
+from theory import BarrierAt, board_theory
+
+
+def barrier_heatmap(grid_size, cars, cache_dir=None):
+    """
+    The likelihood of a barrier on every cell over the models of the board's theory with
+    its barriers left open, as a grid of floats with None on the cells the cars cover.
+    The theory is compiled by dsharp once (or read back from cache_dir) and every cell
+    comes out of a single pass over the circuit.
+    """
+    covered = {cell for car in cars for cell in car.cells()}
+
+    T = lib204.Encoding(cache_dir)
+    T.add_constraint(board_theory(grid_size, cars, []).compile())
+    # Barriers cannot be parked on top of a car
+    for x, y in sorted(covered):
+        T.add_constraint(~Var(BarrierAt(x, y)))
+
+    cells = [(x, y) for y in range(grid_size) for x in range(grid_size) if (x, y) not in covered]
+    values = dict(zip(cells, T.likelihoods([Var(BarrierAt(x, y)) for x, y in cells])))
+    return [[values.get((x, y)) for x in range(grid_size)] for y in range(grid_size)]
+
+
+def format_heatmap(heatmap):
+    """
+    Lay a heatmap out as text, one percentage per cell and the cars shown as C.
+    """
+    return "\n".join(" ".join("  C " if value is None else f"{value * 100:3.0f}%" for value in row)
+                     for row in heatmap) + "\n"
+
+
+if __name__ == "__main__":
+    from examples import examples
+    from run import generate_set_board
+
+    parser = argparse.ArgumentParser(description="Show how likely a barrier is on each cell of an example board.")
+    parser.add_argument("--example", type=int, default=3, help="example number, 1 - 9")
+    parser.add_argument("--cache-dir", default=None, help="where to keep compiled theories between runs")
+    args = parser.parse_args()
+
+    example = examples[args.example - 1]
+    _, cars, _ = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+    print(format_heatmap(barrier_heatmap(example["size"], cars, args.cache_dir)), end="")
@@ -0,0 +1,143 @@
+import argparse
+from itertools import combinations
+from math import comb
+
+from board import Board
+
+
+class LayoutCounter:
+    def __init__(self, grid_size, cars):
+        """
+        Count and list the placements of k barriers that keep a fixed set of cars winnable,
+        with cars blocking each other as they do in escape_order.
+        A barrier only matters through the escape paths (rays) it closes, so whether a layout
+        is winnable depends on nothing but the set of closed rays. The search walks the
+        empty cells that lie on some ray, deciding barrier or not for each, and remembers
+        the count for every (cell, barriers left, closed rays) state it reaches. Cells on no
+        ray add a binomial factor at the end instead of being walked.
+        """
+        board = Board(grid_size)
+        for car in cars:
+            board.place_car(car.car_id, car.x, car.y, car.orientation, car.length)
+
+        # Rays 2n and 2n + 1 are the forward and backward paths of the nth car. Sets of cars
+        # are ray bitmasks too, with both bits of each car set
+        ids = list(board.positions)
+        car_bit = {car_id: 3 << (2 * n) for n, car_id in enumerate(ids)}
+        self.car_bits = [3 << (2 * (n // 2)) for n in range(2 * len(ids))]
+        self.all_rays = (1 << (2 * len(ids))) - 1
+        self.blockers = []
+        ray_masks = {}
+        for car_id in ids:
+            for direction in ("forwards", "backwards"):
+                bit = 1 << len(self.blockers)
+                path = board.path(car_id, direction)
+                self.blockers.append(sum({car_bit[board.at(x, y)] for x, y in path if board.at(x, y) > 0}))
+                for cell in path:
+                    if board.is_empty(*cell):
+                        ray_masks[cell] = ray_masks.get(cell, 0) | bit
+
+        # A car is stuck for good once both of its rays are closed
+        self.both = [3 << i for i in range(0, len(self.blockers), 2)]
+        self.cells = sorted(ray_masks, key=lambda cell: (cell[1], cell[0]))
+        self.masks = [ray_masks[cell] for cell in self.cells]
+        # The rays that the cells from i on can still close
+        self.reach = [0] * (len(self.cells) + 1)
+        for i in range(len(self.cells) - 1, -1, -1):
+            self.reach[i] = self.reach[i + 1] | self.masks[i]
+        self.free = [(x, y) for y in range(grid_size) for x in range(grid_size)
+                     if board.is_empty(x, y) and (x, y) not in ray_masks]
+        self._escaped = {}
+        self._memo = {}
+
+    def escaped(self, closed):
+        """
+        The rays of the cars that can leave when the rays in the closed bitmask hold a
+        barrier, as a bitmask. A car leaves as soon as one of its open rays has no cars
+        left on it.
+        """
+        if closed not in self._escaped:
+            gone = 0
+            progress = True
+            while progress:
+                progress = False
+                for i, car_bit in enumerate(self.car_bits):
+                    if not gone & car_bit and not closed >> i & 1 and self.blockers[i] & gone == self.blockers[i]:
+                        gone |= car_bit
+                        progress = True
+            self._escaped[closed] = gone
+        return self._escaped[closed]
+
+    def winnable(self, closed):
+        return self.escaped(closed) == self.all_rays
+
+    def _count(self, i, k, closed):
+        """
+        The number of ways to place k more barriers on the cells from i on (and the free
+        cells) that keep the board winnable, given the rays already closed.
+        """
+        # Closing more rays never helps, so a dead state stays dead
+        if any(closed & both == both for both in self.both) or not self.winnable(closed):
+            return 0
+        left = len(self.cells) - i + len(self.free)
+        if i == len(self.cells) or k > left:
+            return comb(left, k)
+        if k == 0:
+            return 1
+
+        # Cars that leave even with every reachable ray closed leave whatever comes next,
+        # so their rays are dropped from the state and equal futures share one entry
+        sure = self.escaped(closed | self.reach[i])
+        if sure == self.all_rays:
+            return comb(left, k)
+        closed &= ~sure
+
+        key = (i, k, closed)
+        if key not in self._memo:
+            self._memo[key] = self._count(i + 1, k, closed) + self._count(i + 1, k - 1, closed | self.masks[i])
+        return self._memo[key]
+
+    def count(self, k):
+        """
+        How many placements of k barriers keep the board winnable.
+        """
+        return self._count(0, k, 0)
+
+    def layouts(self, k):
+        """
+        Yield every winnable placement of k barriers as a sorted list of (x, y) cells.
+        Branches the counts show to be empty are never entered, so every step of the
+        walk leads to at least one layout.
+        """
+        yield from self._layouts(0, k, 0, [])
+
+    def _layouts(self, i, k, closed, chosen):
+        if not self._count(i, k, closed):
+            return
+        if i == len(self.cells) or k == 0:
+            for rest in combinations(self.free, k):
+                yield sorted(chosen + list(rest), key=lambda cell: (cell[1], cell[0]))
+            return
+        yield from self._layouts(i + 1, k, closed, chosen)
+        yield from self._layouts(i + 1, k - 1, closed | self.masks[i], chosen + [self.cells[i]])
+
+
+if __name__ == "__main__":
+    from examples import examples
+    from run import generate_set_board
+
+    parser = argparse.ArgumentParser(description="Count the barrier layouts that keep an example's cars winnable.")
+    parser.add_argument("--example", type=int, default=3, help="example number, 1 - 9")
+    parser.add_argument("--barriers", type=int, default=None, help="only this many barriers (default: every count)")
+    parser.add_argument("--list", action="store_true", help="print the layouts as well")
+    args = parser.parse_args()
+
+    example = examples[args.example - 1]
+    _, cars, _ = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+    counter = LayoutCounter(example["size"], cars)
+    empty = len(counter.cells) + len(counter.free)
+    for k in ([args.barriers] if args.barriers is not None else range(empty + 1)):
+        print(f"{k} barriers: {counter.count(k)} winnable layouts of {comb(empty, k)}")
+        if args.list:
+            for layout in counter.layouts(k):
+                print("  " + " ".join(f"({x},{y})" for x, y in layout))
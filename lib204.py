@@ -1,10 +1,58 @@
 
-from nnf import And, dsharp, NNF, config
+import hashlib
+import json
+import operator
+import os
+import subprocess
+import tempfile
+from collections import OrderedDict
+
+from nnf import And, Or, Var, dsharp, dimacs, NNF, config, amc, false, true
+
+import profiling
+from profiling import span, count
+
+
+# Model counts shared by every encoding, keyed by (theory key, conditioning literals)
+COUNT_CACHE_SIZE = 4096
+_counts = OrderedDict()
+
+
+def _canonical(node, memo):
+    """
+    Spell out a sentence with the children of every node sorted, so equal theories
+    give the same text in every run regardless of set ordering.
+    """
+    if id(node) not in memo:
+        if isinstance(node, Var):
+            text = ("" if node.true else "~") + str(node.name)
+        else:
+            kind = "A" if isinstance(node, And) else "O"
+            text = kind + "(" + ",".join(sorted(_canonical(child, memo) for child in node.children)) + ")"
+        memo[id(node)] = text
+    return memo[id(node)]
+
+
+class _AuxLabels(dict):
+    """
+    Variable labels for dsharp.load that name any number it was not given ("aux", number).
+    """
+    def __missing__(self, number):
+        return ("aux", number)
 
 
 class Encoding(object):
-    def __init__(self):
+    def __init__(self, cache_dir=None):
+        """
+        With cache_dir set, the CNF and dsharp's d-DNNF output are kept there under the
+        theory's key, so compiling the same theory again (in this run or a later one)
+        reads the circuit back instead of running dsharp.
+        """
         self.constraints = []
+        self.cache_dir = cache_dir
+        self._compiled = None
+        self._order = None
+        self._key = None
 
     def vars(self):
         ret = set()
@@ -27,6 +75,19 @@ class Encoding(object):
     def add_constraint(self, c):
         assert isinstance(c, NNF), "Constraints need to be of type NNF"
         self.constraints.append(c)
+        self._compiled = None
+        self._order = None
+        self._key = None
+
+    def key(self):
+        """
+        A hash of the theory that is the same for equal theories across runs.
+        """
+        if self._key is None:
+            memo = {}
+            text = "\n".join(sorted(_canonical(c, memo) for c in self.constraints))
+            self._key = hashlib.sha1(text.encode()).hexdigest()
+        return self._key
 
     @config(sat_backend="kissat")
     def is_satisfiable(self):
@@ -36,16 +97,198 @@ class Encoding(object):
     def solve(self):
         return And(self.constraints).solve()
 
-    def count_solutions(self, lits=[]):
-        if lits:
-            T = And(self.constraints + lits)
-        else:
+    def compile(self):
+        """
+        Compile the theory to a smooth d-DNNF with dsharp, once.
+        The circuit is kept until the next constraint is added, and every counting
+        query is answered from it in-process.
+        """
+        if self._compiled is None:
             T = And(self.constraints)
+            with span("satisfiable"):
+                satisfiable = T.satisfiable()
+            if not satisfiable:
+                self._compiled = false
+            else:
+                cnf = T.to_CNF()
+                count("cnf_clauses", len(cnf.children))
+                with span("dsharp"):
+                    if self.cache_dir is None:
+                        self._compiled = dsharp.compile(cnf, executable='bin/dsharp', smooth=True)
+                    else:
+                        self._compiled = self._compile_cached(cnf)
+                if profiling.active is not None:
+                    count("dnnf_size", self._compiled.size())
+        return self._compiled
+
+    def _compile_cached(self, cnf):
+        """
+        Run dsharp on the CNF once per theory key and keep its output file.
+        The theory's variables are numbered first, in order of their names, so every run
+        numbers them the same way; the auxiliary variables introduced by the CNF conversion
+        come after them and only get fresh labels when the file is read back.
+        Every file is written under a temporary name of its own and then moved into place,
+        the variable list before the circuit, so processes compiling the same theory at
+        once never mix their files.
+        """
+        if not cnf.children:
+            return true
 
-        if not T.satisfiable():
-            return 0
+        base = os.path.join(self.cache_dir, self.key())
+        theory_names = {str(name): name for name in self.vars()}
+        if not os.path.exists(base + ".nnf"):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            names = sorted((name for name in cnf.vars() if str(name) in theory_names), key=str)
+            aux = [name for name in cnf.vars() if str(name) not in theory_names]
+            numbers = {name: i for i, name in enumerate(names + aux, start=1)}
 
-        return dsharp.compile(T.to_CNF(), executable='bin/dsharp', smooth=True).model_count()
+            def temporary(suffix):
+                fd, path = tempfile.mkstemp(dir=self.cache_dir, prefix=self.key() + ".", suffix=suffix)
+                os.close(fd)
+                return path
+
+            cnf_path, vars_path, nnf_path = temporary(".cnf"), temporary(".vars.json"), temporary(".nnf")
+            try:
+                with open(cnf_path, "w") as f:
+                    dimacs.dump(cnf, f, mode='cnf', var_labels=numbers)
+                with open(vars_path, "w") as f:
+                    json.dump([str(name) for name in names], f)
+                subprocess.run(['bin/dsharp', '-smoothNNF', '-Fnnf', nnf_path, cnf_path],
+                               stdout=subprocess.DEVNULL, check=True)
+                os.replace(cnf_path, base + ".cnf")
+                os.replace(vars_path, base + ".vars.json")
+                os.replace(nnf_path, base + ".nnf")
+            finally:
+                for path in (cnf_path, vars_path, nnf_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        with open(base + ".vars.json") as f:
+            labels = {i: theory_names[name] for i, name in enumerate(json.load(f), start=1)}
+        with open(base + ".nnf") as f:
+            # Numbers past the theory's variables are auxiliary ones
+            D = dsharp.load(f, _AuxLabels(labels))
+        D.mark_deterministic()
+        NNF.decomposable.set(D, True)
+        return D
+
+    def count_solutions(self, lits=[]):
+        """
+        Count the models of the theory that agree with the given literals.
+        Conditioning gives the opposite literals a weight of 0 in the compiled circuit.
+        """
+        assert all(isinstance(lit, Var) for lit in lits), "Can only condition on literals"
+        key = (self.key(), frozenset(lits))
+        if key in _counts:
+            _counts.move_to_end(key)
+            return _counts[key]
+
+        blocked = {lit.negate() for lit in lits}
+        D = self.compile()
+        with span("count_solutions"):
+            result = amc.eval(D, operator.add, operator.mul, 0, 1, lambda leaf: 0 if leaf in blocked else 1)
+
+        _counts[key] = result
+        if len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+        return result
+
+    def _topological(self):
+        """
+        The nodes of the compiled circuit with every child before its parent, and for each
+        node the positions of its children in that list. Worked out once per compilation.
+        """
+        if self._order is None:
+            D = self.compile()
+            order = []
+            seen = set()
+            stack = [(D, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded:
+                    order.append(node)
+                elif node not in seen:
+                    seen.add(node)
+                    stack.append((node, True))
+                    if not isinstance(node, Var):
+                        stack.extend((child, False) for child in node.children)
+            index = {node: i for i, node in enumerate(order)}
+            children = [[] if isinstance(node, Var) else [index[child] for child in node.children] for node in order]
+            self._order = order, children
+        return self._order
+
+    def is_satisfiable_under(self, lits):
+        """
+        Whether the theory has a model that agrees with the given literals.
+        Answered with one pass over the compiled circuit, so the theory only goes through
+        a solver once however many queries follow.
+        """
+        blocked = {lit.negate() for lit in lits}
+        order, children = self._topological()
+        value = [False] * len(order)
+        for i, node in enumerate(order):
+            if isinstance(node, Var):
+                value[i] = node not in blocked
+            elif isinstance(node, Or):
+                value[i] = any(value[c] for c in children[i])
+            else:
+                value[i] = all(value[c] for c in children[i])
+        return value[-1]
+
+    def _literal_counts(self):
+        """
+        Count the models containing each literal with one upward and one downward pass.
+        On a smooth d-DNNF the number of models with a literal is the derivative of the
+        model count with respect to that literal's leaves.
+        """
+        D = self.compile()
+        order, _ = self._topological()
+
+        # Upward pass: model counts of every sub-circuit
+        up = {}
+        for node in order:
+            if isinstance(node, Var):
+                up[node] = 1
+            elif isinstance(node, Or):
+                up[node] = sum(up[child] for child in node.children)
+            else:
+                up[node] = 1
+                for child in node.children:
+                    up[node] *= up[child]
+
+        # Downward pass: how many models each node takes part in
+        down = dict.fromkeys(order, 0)
+        down[D] = 1
+        for node in reversed(order):
+            if isinstance(node, Var) or not down[node]:
+                continue
+            children = list(node.children)
+            if isinstance(node, Or):
+                for child in children:
+                    down[child] += down[node]
+                continue
+            # Products of the other children, without dividing by counts that may be 0
+            suffix = [1] * (len(children) + 1)
+            for i in range(len(children) - 1, -1, -1):
+                suffix[i] = suffix[i + 1] * up[children[i]]
+            prefix = 1
+            for i, child in enumerate(children):
+                down[child] += down[node] * prefix * suffix[i + 1]
+                prefix *= up[child]
+
+        counts = {}
+        for node in order:
+            if isinstance(node, Var):
+                counts[node] = counts.get(node, 0) + down[node]
+        return up[D], counts, D.vars()
 
     def likelihood(self, lit):
         return self.count_solutions([lit]) / self.count_solutions()
+
+    def likelihoods(self, lits):
+        """
+        Return the likelihood of every literal in lits, from a single pass over the compiled theory.
+        """
+        total, counts, names = self._literal_counts()
+        # A variable the theory never mentions leaves the count unchanged
+        return [(counts.get(lit, 0) if lit.name in names else total) / total for lit in lits]
@@ -0,0 +1,160 @@
+from bauhaus import proposition, And
+
+from run import build_board
+from theory import E, BarrierAt, new_encoding
+
+
+@proposition(E)
+class Exited:
+    def __init__(self, car_id, t):
+        """
+        Represents that a car has left the board by step t.
+        """
+        self.car_id = car_id
+        self.t = t
+
+    def _prop_name(self):
+        return f"Exited({self.car_id},{self.t})"
+
+
+@proposition(E)
+class ParkedAt:
+    def __init__(self, x, y, t):
+        """
+        Represents that a car still covers the cell (x, y) at step t.
+        """
+        self.x = x
+        self.y = y
+        self.t = t
+
+    def _prop_name(self):
+        return f"ParkedAt({self.x},{self.y},{self.t})"
+
+
+@proposition(E)
+class LeavesForwards:
+    def __init__(self, car_id, t):
+        """
+        Represents that a car drives off forwards between step t and t + 1.
+        """
+        self.car_id = car_id
+        self.t = t
+
+    def _prop_name(self):
+        return f"LeavesForwards({self.car_id},{self.t})"
+
+
+@proposition(E)
+class LeavesBackwards:
+    def __init__(self, car_id, t):
+        """
+        Represents that a car drives off backwards between step t and t + 1.
+        """
+        self.car_id = car_id
+        self.t = t
+
+    def _prop_name(self):
+        return f"LeavesBackwards({self.car_id},{self.t})"
+
+
+class PlanningTheory:
+    def __init__(self, grid_size, cars, barriers):
+        """
+        Time-indexed encoding of a board where cars block each other as well as barriers.
+        At every step any number of cars may leave, as long as each of them has a path
+        with no barrier and no parked car on it at the start of the step; leaving never
+        blocks anyone, so that is the same as leaving one by one.
+        The constraints of each step only depend on the board, so they are built once
+        and kept, and deepening the horizon only adds the new steps.
+        """
+        self.grid = build_board(grid_size, cars, barriers)
+        self.car_ids = [car.car_id for car in cars]
+        self.barriers = barriers
+        self.steps = []
+
+    def _step(self, t):
+        """
+        The constraints linking step t to step t + 1.
+        """
+        grid = self.grid
+        constraints = []
+
+        # A cell holds its car until the car has left
+        for car_id in self.car_ids:
+            for x, y in grid.span(car_id):
+                constraints.append(~Exited(car_id, t) >> ParkedAt(x, y, t))
+
+        for car_id in self.car_ids:
+            constraints.append(Exited(car_id, t) >> Exited(car_id, t + 1))
+            leaving = Exited(car_id, t + 1) & ~Exited(car_id, t)
+            constraints.append(leaving >> (LeavesForwards(car_id, t) | LeavesBackwards(car_id, t)))
+
+            for leaves, direction in ((LeavesForwards, "forwards"), (LeavesBackwards, "backwards")):
+                path = grid.path(car_id, direction)
+                clear = And([~BarrierAt(x, y) & ~ParkedAt(x, y, t) for x, y in path])
+                constraints.append(leaves(car_id, t) >> clear)
+        return constraints
+
+    def encoding(self, horizon):
+        """
+        Return the encoding asking whether every car can be gone after horizon steps.
+        """
+        while len(self.steps) < horizon:
+            self.steps.append(self._step(len(self.steps)))
+
+        T = new_encoding()
+        for car_id in self.car_ids:
+            T.add_constraint(~Exited(car_id, 0))
+            T.add_constraint(Exited(car_id, horizon))
+        for barrier in self.barriers:
+            T.add_constraint(BarrierAt(barrier.x, barrier.y))
+        for constraints in self.steps[:horizon]:
+            for c in constraints:
+                T.add_constraint(c)
+        return T
+
+    def solve(self, horizon):
+        """
+        Return a model in which every car has left within horizon steps, or None.
+        """
+        return self.encoding(horizon).compile().solve()
+
+    def exit_order(self, model, horizon):
+        """
+        Read the moves out of a model as (car_id, direction), in the order the cars leave.
+        Cars leaving in the same step keep the order of the car list.
+        """
+        moves = []
+        for t in range(horizon):
+            for car_id in self.car_ids:
+                if model.get(Exited(car_id, t + 1)) and not model.get(Exited(car_id, t)):
+                    direction = "forwards" if model.get(LeavesForwards(car_id, t)) else "backwards"
+                    moves.append((car_id, direction))
+        return moves
+
+    def plan(self):
+        """
+        Deepen the horizon (doubling it each time) until every car can leave.
+        Every step lets at least one car go, so a board that cannot be cleared in as many
+        steps as it has cars is not winnable. Returns (moves, horizon), or (None, None).
+        """
+        if not self.car_ids:
+            return [], 0
+
+        horizon = 1
+        while True:
+            model = self.solve(horizon)
+            if model:
+                return self.exit_order(model, horizon), horizon
+            if horizon >= len(self.car_ids):
+                return None, None
+            horizon = min(horizon * 2, len(self.car_ids))
+
+
+def plan_exits(grid_size, cars, barriers):
+    """
+    Solve a board with the planning encoding. Returns the exit order as a list of
+    (car_id, direction), or None when some car can never leave.
+    """
+    moves, _ = PlanningTheory(grid_size, cars, barriers).plan()
+    return moves
@@ -0,0 +1,100 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# The profiler collecting spans and counters, or None when profiling is off
+active = None
+
+
+class Profiler:
+    def __init__(self, cprofile=False):
+        """
+        Collects the wall time of named spans and the totals of named counters.
+        With cprofile set, the Python profiler also runs while the profiler is active,
+        so the same run can be dumped as a pstats file.
+        """
+        self.spans = {}
+        self.calls = {}
+        self.counters = {}
+        self.profile = None
+        if cprofile:
+            import cProfile
+            self.profile = cProfile.Profile()
+        self._previous = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self):
+        """
+        The metrics collected so far as a JSON-ready dict.
+        """
+        return {
+            "seconds": dict(self.spans),
+            "calls": dict(self.calls),
+            "counters": dict(self.counters),
+        }
+
+    def dump_json(self, path):
+        import json
+        with open(path, "w") as f:
+            json.dump(self.record(), f, indent=2)
+
+    def dump_stats(self, path):
+        if self.profile is None:
+            raise ValueError("Create the Profiler with cprofile=True to dump pstats")
+        self.profile.dump_stats(path)
+
+    def __enter__(self):
+        global active
+        self._previous, active = active, self
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        global active
+        if self.profile is not None:
+            self.profile.disable()
+        active = self._previous
+
+
+@contextmanager
+def span(name):
+    """
+    Time the block under name on the active profiler; does nothing when profiling is off.
+    """
+    if active is None:
+        yield
+    else:
+        with active.span(name):
+            yield
+
+
+def count(name, n=1):
+    if active is not None:
+        active.count(name, n)
+
+
+def spanned(name):
+    """
+    Decorate a function so every call is timed as a span under name.
+    """
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if active is None:
+                return fn(*args, **kwargs)
+            with active.span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
@@ -0,0 +1,86 @@
+import sys
+
+
+def cell_token(grid, value):
+    """
+    The text shown for one cell: the car id and orientation, B for a barrier or . when empty.
+    """
+    if value > 0:
+        return f"{value}{grid.orientations[value]}"
+    if value < 0:
+        return " B "
+    return " . "
+
+
+class FrameBuffer:
+    def __init__(self, grid):
+        """
+        The text of every cell of a board, built once from the occupancy index
+        and patched in place as cars leave, so a frame is a single join.
+        """
+        self.size = grid.size
+        self.tokens = [cell_token(grid, value) for value in grid.cells]
+
+    def clear(self, x, y):
+        self.tokens[y * self.size + x] = " . "
+
+    def text(self):
+        size = self.size
+        return "".join(" ".join(self.tokens[y * size:(y + 1) * size]) + "\n" for y in range(size)) + "\n"
+
+
+def car_lines(cars):
+    return [f"Processing Car: ID={car.car_id}, Orientation={car.orientation}\n" for car in cars]
+
+
+def write_grid(grid, cars, out=None):
+    """
+    Write one frame showing the grid with car and barrier positions.
+    """
+    out = out or sys.stdout
+    out.write("".join(car_lines(cars)) + FrameBuffer(grid).text())
+
+
+def play_solution(grid, cars, moves, stuck, out=None, mode="full"):
+    """
+    Write the solution as the cars leave the grid one by one, removing them from grid and cars.
+    mode "full" writes every frame, "delta" writes the starting frame and then only the
+    cells that change, and "summary" writes just the outcome.
+    Each frame is written to out (any file-like object, stdout by default) in one call.
+    """
+    out = out or sys.stdout
+    frame = FrameBuffer(grid)
+    lines = dict(zip((car.car_id for car in cars), car_lines(cars)))
+
+    if mode == "delta":
+        out.write("Initial Grid:\n" + frame.text())
+
+    for iteration, (car_id, direction) in enumerate(moves):
+        cells = grid.span(car_id)
+        if mode == "full":
+            out.write(f"Iteration {iteration}:\n" + "".join(lines.values()) + frame.text()
+                      + f"Car {car_id} has exited {direction}.\n\n")
+        elif mode == "delta":
+            token = cell_token(grid, car_id).strip()
+            out.write(f"Iteration {iteration}: Car {car_id} has exited {direction}, "
+                      + ", ".join(f"({x}, {y}) {token} -> ." for x, y in cells) + "\n")
+
+        del lines[car_id]
+        for x, y in cells:
+            frame.clear(x, y)
+        grid.remove_car(car_id)
+
+    cars[:] = [car for car in cars if car.car_id in lines]
+
+    # If no car can escape, it's a losing state
+    if stuck:
+        if mode == "full":
+            out.write(f"Iteration {len(moves)}:\n" + "".join(lines.values()) + frame.text())
+        else:
+            out.write(f"{len(moves)} cars escaped, {len(stuck)} stuck.\n")
+        out.write("No car can escape. This is not a winning state.\n")
+        return
+
+    if mode == "summary":
+        out.write(f"{len(moves)} cars escaped.\n")
+    out.write("All cars have escaped! Winning state achieved.\n")
@@ -1,454 +1,383 @@
-from bauhaus import Encoding, proposition, constraint, And, Or
+import random
 
-from examples import examples
+from board import Board, Car, Barrier
+from solver import escape_order, theory_verdict
+from render import write_grid, play_solution
+from profiling import span, count
 
- 
-from nnf import config
-config.sat_backend = "kissat"
+# The SAT stack (bauhaus, nnf and the propositions) lives in theory.py and is only imported
+# the first time one of these names is used, so simulation-only runs never pay for it
+THEORY_NAMES = {"E", "Orientation", "CarAt", "BarrierAt", "Empty", "EscapeForwards", "EscapeBackwards", "RayClear",
+                "new_encoding", "empty_constraints", "STEPS", "compact_rules", "example_theory", "board_theory",
+                "solve_theory"}
 
 
+def __getattr__(name):
+    if name in THEORY_NAMES:
+        import theory
+        return getattr(theory, name)
+    raise AttributeError(f"module 'run' has no attribute {name!r}")
 
-E = Encoding()
 
-
-# Define Propositions
-@proposition(E)
-class Orientation:
-    def __init__(self, car_id, direction):
-        """
-        Represents the orientation of a car.
-        direction: 'NS' for North/South or 'EW' for East/West
-        N is always forwards for NS cars, E is forwards for EW Cars
-        """
-        self.car_id = car_id
-        self.direction = direction
-
-    def _prop_name(self):
-        return f"Orientation({self.car_id},{self.direction})"
-
-
-@proposition(E)
-class CarAt:
-    def __init__(self, x, y):
-        """
-        Represents whether a car is at a specific location (x, y).
-        """
-        self.x = x
-        self.y = y
-
-    def _prop_name(self):
-        return f"CarAt({self.x},{self.y})"
-
-
-@proposition(E)
-class BarrierAt:
-    def __init__(self, x, y):
-        """
-        Represents whether a barrier is at a specific location (x, y).
-        """
-        self.x = x
-        self.y = y
-
-    def _prop_name(self):
-        return f"BarrierAt({self.x},{self.y})"
-
-
-
-@proposition(E)
-class Empty:
-    def __init__(self, x, y):
-        """
-        Represents whether a location (x, y) is empty.
-        """
-        self.x = x
-        self.y = y
-
-    def _prop_name(self):
-        return f"Empty({self.x},{self.y})"
-
-
-@proposition(E)
-class EscapeForwards:
-    def __init__(self, car_id):
-        """
-        Represents whether a car can escape forwards.
-        """
-        self.car_id = car_id
-
-    def _prop_name(self):
-        return f"EscapeForwards({self.car_id})"
-
-
-@proposition(E)
-class EscapeBackwards:
-    def __init__(self, car_id):
-        """
-        Represents whether a car can escape backwards.
-        """
-        self.car_id = car_id
-
-    def _prop_name(self):
-        return f"EscapeBackwards({self.car_id})"
-
-
-
-@proposition(E)
-class Car:
-    def __init__(self, car_id, x, y, orientation):
-        self.car_id = car_id
-        self.x = x
-        self.y = y
-        self.orientation = orientation
-
-    
-    def _prop_name(self):
-        return f"Car({self.car_id}, x = {self.x}, y = {self.y}, orientation = {self.orientation})"
-
-@proposition(E)
-class Barrier:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-
-    def _prop_name(self):
-        return f"Barrier({self.x}, {self.y})"
-    
-
-    
-
-
-# Build an example full theory for your setting and return it.
-#
-#  There should be at least 10 variables, and a sufficiently large formula to describe it (>50 operators).
-#  This restriction is fairly minimal, and if there is any concern, reach out to the teaching staff to clarify
-#  what the expectations are.
-
-
-def example_theory(grid_size, cars):
+def build_board(grid_size, cars, barriers):
     """
-    Define the constraints for the parking jam game, ensuring that the board state
-    determines if all cars can escape or if any car is completely blocked.
+    Build the occupancy index for a list of cars and barriers.
     """
-    # Constraint: A cell is empty if it contains neither a car nor a barrier
-    for x in range(grid_size):
-        for y in range(grid_size):
-            E.add_constraint(Empty(x, y) >> (~CarAt(x, y) & ~BarrierAt(x, y)))
+    grid = Board(grid_size)
+    for car in cars:
+        grid.place_car(car.car_id, car.x, car.y, car.orientation, car.length)
+    for barrier in barriers:
+        grid.place_barrier(barrier.x, barrier.y)
+    return grid
 
 
-    # loop through cars list and add constraints for each one
-    for car in cars:
-        if car.orientation == 'EW':
-            # Escape constraints for EW cars
-            escape_right = And([~BarrierAt(car.x + i, car.y) for i in range(1, grid_size - car.x)])
-            escape_left = And([~BarrierAt(car.x - i, car.y) for i in range(1, car.x + 1)])
-            
-            E.add_constraint(EscapeForwards(car.car_id) >> escape_right)
-            E.add_constraint(EscapeBackwards(car.car_id) >> escape_left)
-
-            # Fully blocked state for EW cars
-            barriers_left = And([BarrierAt(car.x - i, car.y) for i in range(1, car.x + 1)])
-            barriers_right = And([BarrierAt(car.x + i, car.y) for i in range(1, grid_size - car.x)])
-            
-            fully_blocked_by_barriers = And(barriers_left, barriers_right)
-            E.add_constraint(fully_blocked_by_barriers >> ~EscapeForwards(car.car_id))
-            E.add_constraint(fully_blocked_by_barriers >> ~EscapeBackwards(car.car_id))
-
-        elif car.orientation == 'NS':
-            # Escape constraints for NS cars
-            escape_up = And([~BarrierAt(car.x, car.y - i) for i in range(1, car.y + 1)])
-            escape_down = And([~BarrierAt(car.x, car.y + i) for i in range(1, grid_size - car.y)])
-            
-            E.add_constraint(EscapeForwards(car.car_id) >> escape_up)
-            E.add_constraint(EscapeBackwards(car.car_id) >> escape_down)
-
-            # Fully blocked state for NS cars
-            barriers_up = And([BarrierAt(car.x, car.y - i) for i in range(1, car.y + 1)])
-            barriers_down = And([BarrierAt(car.x, car.y + i) for i in range(1, grid_size - car.y)])
-            
-            fully_blocked_by_barriers = And(barriers_up, barriers_down)
-            E.add_constraint(fully_blocked_by_barriers >> ~EscapeForwards(car.car_id))
-            E.add_constraint(fully_blocked_by_barriers >> ~EscapeBackwards(car.car_id))
-
-    # Define a winning state: All cars can escape
-    all_cars_escape = And([EscapeForwards(car.car_id) | EscapeBackwards(car.car_id) for car in cars])
-
-    # Define a losing state: Any car is blocked on both sides by barriers
-    any_car_blocked = Or([And([
-        And([BarrierAt(car.x - i, car.y) for i in range(1, car.x + 1)]),
-        And([BarrierAt(car.x + i, car.y) for i in range(1, grid_size - car.x)])
-    ]) if car.orientation == "EW" else And([
-        And([BarrierAt(car.x, car.y - i) for i in range(1, car.y + 1)]),
-        And([BarrierAt(car.x, car.y + i) for i in range(1, grid_size - car.y)])
-    ]) for car in cars])
-
-    E.add_constraint(all_cars_escape)
-    E.add_constraint(~any_car_blocked)
-
-    return E
-
-
-
-def is_winning_state(grid_size, cars, barriers):
-    # Compile constraints
-    T = example_theory(grid_size, cars)
-    T = T.compile()
-
-    # Check satisfiability
-    if T.satisfiable():
-        S = T.solve()
-       
-        print("\nBarrier States:")
-        for barrier in barriers:
-            barrier_at = S.get(BarrierAt(barrier.x, barrier.y), "Unknown")
-            print(f"Barrier at ({barrier.x}, {barrier.y}): {barrier_at}")
-
-        # Check if all cars can escape
-        all_escaped = all(S.get(EscapeForwards(car.car_id), False) or S.get(EscapeBackwards(car.car_id), False) for car in cars)
-        if all_escaped:
-            print("All cars can escape!\n")
-            return True
+def is_winning_state(grid_size, cars, barriers, verbose=True, use_sat=False, cross_validate=False, cache=None,
+                     compact=False):
+    """
+    Decide whether every car has a way off the board.
+    The answer comes from a bitset escape analysis of the board. The SAT theory is only
+    compiled when use_sat is set (to get a model) or when cross_validate is set, in which
+    case both answers must agree. A cache.TheoryCache lets the SAT path reuse earlier verdicts,
+    and compact selects the smaller encoding.
+    """
+    S = None
+    if use_sat or cross_validate:
+        # Only now is the SAT stack worth importing
+        from theory import solve_theory, BarrierAt
+        if cache is not None:
+            winnable = cache.satisfiable(grid_size, cars, barriers)
         else:
-            print("Not all cars can escape.")
-            return False
+            winnable, S = solve_theory(grid_size, cars, barriers, compact)
+        if cross_validate and winnable != theory_verdict(build_board(grid_size, cars, barriers)):
+            raise RuntimeError("Escape analysis and SAT theory disagree on this board.")
+    else:
+        with span("escape_analysis"):
+            winnable = theory_verdict(build_board(grid_size, cars, barriers))
+
+    if winnable:
+        if verbose:
+            print("\nBarrier States:")
+            for barrier in barriers:
+                # Without a model every barrier is simply one of the board's facts
+                barrier_at = S.get(BarrierAt(barrier.x, barrier.y), "Unknown") if S else True
+                print(f"Barrier at ({barrier.x}, {barrier.y}): {barrier_at}")
+            print("All cars can escape!\n")
+        return True
     else:
-        print("No solution found. Not a winning state.")
+        if verbose:
+            print("No solution found. Not a winning state.")
         return False
 
 
-# docker build -t parking-jam-3d .
-# docker run -it --rm parking-jam-3d /bin/bash
-
-
-def display_grid(grid, cars, barriers):
+def display_grid(grid, cars, barriers, out=None):
     """
     Display the grid with car and barrier positions.
     """
-    for car in cars:
-        print(f"Processing Car: ID={car.car_id}, Orientation={car.orientation}")
-    for y in range(len(grid)):
-        row = []
-        for x in range(len(grid[0])):
-            # Check if a car is at the current position
-            car_at_position = next((c for c in cars if c.x == x and c.y == y), None)
-            if car_at_position:
-                # Directly use the orientation from the car object
-                row.append(f"{car_at_position.car_id}{car_at_position.orientation}")
-            elif any(b.x == x and b.y == y for b in barriers):
-                # Add B for barriers
-                row.append(" B ")
-            else:
-                # Add . for empty spaces
-                row.append(" . ")
-        print(" ".join(row))
-    print()
+    write_grid(grid, cars, out)
 
 
 def generate_set_board(size, car_list, barrier_list):
     """
-    Generate a board with a set list of cars and barriers, and tie it to the propositions.
+    Generate a board with a set list of cars and barriers.
+    Use board_theory to build the matching encoding.
     """
     global cars, barriers
-    grid = [[0 for _ in range(size)] for _ in range(size)]
+    grid = Board(size)
     cars = []
     barriers = []
 
-    # Add cars from the provided car list
+    # Add cars from the provided car list, optionally with a length as a fifth item
     for car_data in car_list:
-        car_id, x, y, orientation = car_data
-        if grid[y][x] == 0:  # Ensure the cell is empty
-            grid[y][x] = car_id
-            new_car = Car(car_id, x, y, orientation)
+        car_id, x, y, orientation = car_data[:4]
+        length = car_data[4] if len(car_data) > 4 else 1
+        if grid.fits(x, y, orientation, length):  # Ensure the cells are empty
+            grid.place_car(car_id, x, y, orientation, length)
+            new_car = Car(car_id, x, y, orientation, length)
             cars.append(new_car)
-            
-            # Add the car's position and orientation to the encoding
-            E.add_constraint(CarAt(x, y))
-            E.add_constraint(Orientation(car_id, orientation))
 
     # Add barriers from the provided barrier list
     for barrier_data in barrier_list:
         x, y = barrier_data
-        if grid[y][x] == 0:  # Ensure the cell is empty
-            grid[y][x] = -1
+        if grid.is_empty(x, y):  # Ensure the cell is empty
+            grid.place_barrier(x, y)
             new_barrier = Barrier(x, y)
             barriers.append(new_barrier)
-            
-
-            # Add the barrier's position to the encoding
-            E.add_constraint(BarrierAt(x, y))
 
     return grid, cars, barriers
 
 
 
-def generate_random_board(size, num_cars, num_barriers):
+def _walled(barriers, i, size):
     """
-    Generate a random board with cars and barriers, and tie it to the propositions.
+    Whether a car at position i of a line would sit on the edge with only barriers on its
+    other side, which example_theory treats as blocked. barriers is the line's bitset.
     """
-    global cars, barriers
-    grid = [[0 for _ in range(size)] for _ in range(size)]
-    cars = []
-    barriers = []
+    full = (1 << size) - 1
+    return i == 0 and barriers == full & ~1 or i == size - 1 and barriers == full >> 1
 
-    # Add cars
-    for car_id in range(1, num_cars + 1):
-        while True:
-            x, y = random.randint(0, size - 1), random.randint(0, size - 1)
-            orientation = random.choice(['NS', 'EW'])
-            if grid[y][x] == 0:  # Empty cell
-                grid[y][x] = car_id
-                cars.append(Car(car_id, x, y, orientation))
-
-                # Add the car's position to the encoding
-                E.add_constraint(CarAt(x, y))
-                E.add_constraint(Orientation(car_id, orientation))
-                break
-
-    # Add barriers
-    for _ in range(num_barriers):
-        while True:
-            x, y = random.randint(0, size - 1), random.randint(0, size - 1)
-            if grid[y][x] == 0:  # Empty cell
-                grid[y][x] = -1
-                barriers.append(Barrier(x, y))
-
-                # Add the barrier's position to the encoding
-                E.add_constraint(BarrierAt(x, y))
-                break
 
-    return grid, cars, barriers
+def _open_count(occupied, barriers, size):
+    """
+    How many positions _open_cells gives for a line, without listing them.
+    """
+    ends = _ends(occupied)
+    count = size if ends is None else ends[0] + size - 1 - ends[1]
+    # Only an edge cell that is still open can be lost to the walled-in rule
+    walled = {i for i in (0, size - 1) if not occupied >> i & 1 and _walled(barriers, i, size)}
+    return count - len(walled)
 
-def display_solution(grid, cars, barriers, grid_size):
+
+def _open_cells(occupied, barriers, size):
     """
-    Display the solution of the game, showing step-by-step how cars escape the grid.
+    The positions along a line where a car driving along it could be parked and still
+    leave: the empty runs at either end of the occupied cells.
+    occupied and barriers are the line's bitsets from Board.
     """
-    iteration = 0
-    while cars:
-        print(f"Iteration {iteration}:")
-        display_grid(grid, cars, barriers)
+    if occupied:
+        cells = list(range((occupied & -occupied).bit_length() - 1)) + list(range(occupied.bit_length(), size))
+    else:
+        cells = list(range(size))
+    return [i for i in cells if not _walled(barriers, i, size)]
 
-        escaping_car = None
-        escape_direction = None
-
-        for car in cars:
-            can_escape_forwards = True
-            can_escape_backwards = True
-
-            # Check forward and backward paths based on orientation
-            if car.orientation == 'EW':
-                # Check forward (right)
-                for i in range(1, grid_size - car.x):
-                    if any(b.x == car.x + i and b.y == car.y for b in barriers):
-                        can_escape_forwards = False
-                        break
-                    if any(c.x == car.x + i and c.y == car.y for c in cars):
-                        can_escape_forwards = False
-                        break
-
-                # Check backward (left)
-                for i in range(1, car.x + 1):
-                    if any(b.x == car.x - i and b.y == car.y for b in barriers):
-                        can_escape_backwards = False
-                        break
-                    if any(c.x == car.x - i and c.y == car.y for c in cars):
-                        can_escape_backwards = False
-                        break
-
-            elif car.orientation == 'NS':
-                # Check forward (up)
-                for i in range(1, car.y + 1):
-                    if any(b.x == car.x and b.y == car.y - i for b in barriers):
-                        can_escape_forwards = False
-                        break
-                    if any(c.x == car.x and c.y == car.y - i for c in cars):
-                        can_escape_forwards = False
-                        break
-
-                # Check backward (down)
-                for i in range(1, grid_size - car.y):
-                    if any(b.x == car.x and b.y == car.y + i for b in barriers):
-                        can_escape_backwards = False
-                        break
-                    if any(c.x == car.x and c.y == car.y + i for c in cars):
-                        can_escape_backwards = False
-                        break
-
-            # If a car can escape, choose the direction and break the loop
-            if can_escape_forwards:
-                escaping_car = car
-                escape_direction = "forwards"
-                break
-            elif can_escape_backwards:
-                escaping_car = car
-                escape_direction = "backwards"
-                break
-
-        # If no car can escape, it's a losing state
-        if not escaping_car:
-            print("No car can escape. This is not a winning state.")
-            return
-
-        # Remove the escaping car from the grid and update propositions
-        print(f"Car {escaping_car.car_id} has exited {escape_direction}.\n")
-        cars.remove(escaping_car)
-        for x in range(grid_size):
-            for y in range(grid_size):
-                if grid[y][x] == escaping_car.car_id:
-                    grid[y][x] = 0  # Mark the cell as empty
-
-        iteration += 1
-
-    # Print final message only once after all cars have exited
-    print("All cars have escaped! Winning state achieved.")
 
+def _ends(occupied):
+    """
+    The first and last occupied positions of a line bitset, or None for an empty line.
+    """
+    if not occupied:
+        return None
+    return (occupied & -occupied).bit_length() - 1, occupied.bit_length() - 1
 
-if __name__ == "__main__":
-    import random
 
-    def main():
-            
-            # Uncomment this to use randomly generated grids
-            """
-            # Prompt user for grid size, number of cars, and barriers
-            grid_size = 10  # You can adjust this as needed
-            num_cars = 13  # Number of cars
-            num_barriers = 13  # Number of barriers
+def _shut(ends, i):
+    """
+    How many open cells of a line taking position i costs: the cell itself and those it
+    shuts in against the occupied run. 0 when i is shut in already.
+    """
+    if ends is None:
+        return 1
+    lo, hi = ends
+    if i < lo:
+        return lo - i
+    if i > hi:
+        return i - hi
+    return 0
+
+
+def _frontier_placements(grid):
+    """
+    The placements that keep the most room for later cars: next to the occupied run of a
+    row or column, or anywhere along an empty one. Each comes with a weight that falls
+    steeply with the open cells it costs the line it crosses.
+    """
+    size = grid.size
+    row_ends = [_ends(occupied) for occupied in grid.rows]
+    col_ends = [_ends(occupied) for occupied in grid.cols]
+    placements = []
+    weights = []
+    for orientation, ends, crossing, barrier_lines in [('EW', row_ends, col_ends, grid.barrier_rows),
+                                                        ('NS', col_ends, row_ends, grid.barrier_cols)]:
+        for line, line_ends in enumerate(ends):
+            if line_ends is None:
+                positions = range(size)
+            else:
+                lo, hi = line_ends
+                positions = [i for i in (lo - 1, hi + 1) if 0 <= i < size and not _walled(barrier_lines[line], i, size)]
+            for i in positions:
+                placements.append((i, line, orientation) if orientation == 'EW' else (line, i, orientation))
+                weights.append(1 / (1 + _shut(crossing[i], line)) ** 4)
+    return placements, weights
+
 
-            if ((num_cars + num_barriers)>grid_size**2):
-                return ("Not enough spaces on grid for cars and barriers")
+# How often a constructed winnable board takes any open placement instead of a frontier one
+EXPLORE = 0.05
 
-            # Generate random grid
-            grid, cars, barriers = generate_random_board(size=grid_size, num_cars=num_cars, num_barriers=num_barriers)
-            """
 
+def generate_random_board(size, num_cars, num_barriers, seed=None, require_winnable=False, require_unwinnable=False):
+    """
+    Generate a random board with cars and barriers.
+    Cells are drawn without replacement from a shuffled pool of free cells. seed makes the
+    board reproducible and may also be a random.Random instance.
+    require_winnable builds the board in reverse escape order: each car is parked where it
+    still has a way out past everything placed before it, so the cars can leave in the
+    opposite order. Most cars extend the occupied run of a row or column, which packs boards
+    to about 90% cars; the rest take any open cell, so every board that can be built this
+    way can come up. ValueError is raised once no cell has a way out left.
+    require_unwinnable parks one car between two barriers.
+    Use board_theory to build the matching encoding.
+    """
+    global cars, barriers
+    if num_cars + num_barriers > size ** 2:
+        raise ValueError("Not enough spaces on grid for cars and barriers")
+    if require_winnable and require_unwinnable:
+        raise ValueError("A board cannot be both winnable and unwinnable")
 
-            # Select an example by changing this variable manually
-            example_number = 1  # Change this number to 1 - 9
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+    grid = Board(size)
+    cars = []
+    barriers = []
 
-            # Fetch the selected example
-            selected_example = examples[example_number - 1]
+    # Free cells in random order; cells taken by a trap are skipped when drawn
+    pool = list(range(size * size))
+    rng.shuffle(pool)
+
+    def draw():
+        while pool:
+            cell = pool.pop()
+            if grid.is_empty(cell % size, cell // size):
+                return cell % size, cell // size
+        # Unreachable: the cell count was checked up front
+        raise ValueError("Not enough spaces on grid for cars and barriers")
+
+    # Shuffle the ids of constructed boards so they do not give the escape order away
+    car_ids = list(range(1, num_cars + 1))
+    if require_winnable or require_unwinnable:
+        rng.shuffle(car_ids)
+
+    if require_unwinnable:
+        if num_cars < 1 or num_barriers < 2 or size < 3:
+            raise ValueError("An unwinnable board needs a car, two barriers and a grid of at least 3x3")
+        # Park the car away from the edges it drives towards, with a barrier on each side
+        orientation = rng.choice(['NS', 'EW'])
+        along, across = rng.randrange(1, size - 1), rng.randrange(size)
+        x, y = (along, across) if orientation == 'EW' else (across, along)
+        dx, dy = (1, 0) if orientation == 'EW' else (0, 1)
+        car_id = car_ids.pop()
+        grid.place_car(car_id, x, y, orientation)
+        cars.append(Car(car_id, x, y, orientation))
+        for bx, by in [(x - dx, y - dy), (x + dx, y + dy)]:
+            grid.place_barrier(bx, by)
+            barriers.append(Barrier(bx, by))
+        num_barriers -= 2
+
+    if require_winnable:
+        # Barriers never move, so they go down first
+        for _ in range(num_barriers):
+            x, y = draw()
+            grid.place_barrier(x, y)
+            barriers.append(Barrier(x, y))
+
+        # Mostly grow the occupied runs of the rows and columns so few cells get shut in,
+        # but now and then take any cell with a way out so that every such board can come up
+        for car_id in car_ids:
+            placements, weights = _frontier_placements(grid)
+            if not placements:
+                raise ValueError("No free cell has a way out left; try fewer cars or barriers")
+            if rng.random() < EXPLORE:
+                # Pick a line by its number of open cells, then one of them
+                lines = [(grid.rows[y], grid.barrier_rows[y], 'EW', y) for y in range(size)]
+                lines += [(grid.cols[x], grid.barrier_cols[x], 'NS', x) for x in range(size)]
+                occupied, barrier_bits, orientation, line = rng.choices(
+                    lines, [_open_count(occupied, barrier_bits, size) for occupied, barrier_bits, _, _ in lines])[0]
+                i = rng.choice(_open_cells(occupied, barrier_bits, size))
+                x, y = (i, line) if orientation == 'EW' else (line, i)
+            else:
+                x, y, orientation = rng.choices(placements, weights)[0]
+            grid.place_car(car_id, x, y, orientation)
+            cars.append(Car(car_id, x, y, orientation))
+    else:
+        # Add cars
+        for car_id in car_ids:
+            x, y = draw()
+            orientation = rng.choice(['NS', 'EW'])
+            grid.place_car(car_id, x, y, orientation)
+            cars.append(Car(car_id, x, y, orientation))
+
+        # Add barriers
+        for _ in range(num_barriers):
+            x, y = draw()
+            grid.place_barrier(x, y)
+            barriers.append(Barrier(x, y))
+
+    cars.sort(key=lambda car: car.car_id)
+    return grid, cars, barriers
 
-            # Extract data from the selected example
-            grid_size = selected_example["size"]
-            car_list = selected_example["car_list"]
-            barrier_list = selected_example["barrier_list"]
 
-            # Call the generate_set_board function with the selected example's data
-            grid, cars, barriers = generate_set_board(grid_size, car_list, barrier_list)
+def display_solution(grid, cars, barriers, grid_size, out=None, mode="full"):
+    """
+    Display the solution of the game, showing step-by-step how cars escape the grid.
+    See render.play_solution for the output modes.
+    """
+    # Solve the whole board once, then play the moves back
+    with span("escape_order"):
+        moves, stuck = escape_order(grid, [car.car_id for car in cars])
+    count("moves", len(moves))
+    with span("display_solution"):
+        play_solution(grid, cars, moves, stuck, out, mode)
 
 
+def load_board(args):
+    """
+    Fetch the board the command line asked for, in the examples schema.
+    """
+    if args.random:
+        size, num_cars, num_barriers = args.random
+        _, cars, barriers = generate_random_board(size, num_cars, num_barriers, args.seed)
+        return {"size": size,
+                "car_list": [(car.car_id, car.x, car.y, car.orientation) for car in cars],
+                "barrier_list": [(barrier.x, barrier.y) for barrier in barriers]}
+    if args.board:
+        from itertools import islice
+        from batch import load_boards
+        board = next(islice(load_boards(args.board), args.index, None), None)
+        if board is None:
+            raise SystemExit(f"{args.board} has no board {args.index}")
+        return board
+
+    from examples import examples
+    if not 1 <= args.example <= len(examples):
+        raise SystemExit(f"Pick an example from 1 to {len(examples)}")
+    return examples[args.example - 1]
+
+
+def main(argv=None):
+    """
+    Check one board from the command line: one of the examples (example 1 by default),
+    a board from a JSONL or corpus file, or a random board.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check whether every car can leave a parking jam board.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--example", type=int, default=1, help="example number, 1 - 9")
+    source.add_argument("--board", help="JSONL or corpus file of boards")
+    source.add_argument("--random", type=int, nargs=3, metavar=("SIZE", "CARS", "BARRIERS"),
+                        help="generate a random board")
+    parser.add_argument("--index", type=int, default=0, help="which board of --board to check")
+    parser.add_argument("--seed", type=int, default=None, help="seed for --random")
+    parser.add_argument("--format", choices=["full", "delta", "summary", "json"], default="full")
+    parser.add_argument("--sat", action="store_true", help="decide the board with the SAT theory")
+    args = parser.parse_args(argv)
+
+    board = load_board(args)
+    grid_size = board["size"]
+    grid, cars, barriers = generate_set_board(grid_size, board["car_list"], board["barrier_list"])
+
+    if args.format == "json":
+        import json
+        from solver import exit_waves
+
+        winnable = is_winning_state(grid_size, cars, barriers, verbose=False, use_sat=args.sat)
+        moves, stuck = escape_order(grid, [car.car_id for car in cars])
+        print(json.dumps({"size": grid_size, "winnable": winnable and not stuck, "moves": moves, "stuck": stuck,
+                          "waves": len(exit_waves(grid)[0])}))
+        return
+
+    if args.format == "full":
+        # Display the generated grid
+        print("Initial Grid:")
+        display_grid(grid, cars, barriers)
 
+    # Check if the generated grid is winnable
+    if is_winning_state(grid_size, cars, barriers, verbose=args.format == "full", use_sat=args.sat):
+        # Display the solution if winnable
+        display_solution(grid, cars, barriers, grid_size, mode=args.format)
+    else:
+        print("This state is not winnable.")
 
-            # Display the generated grid
-            print("Initial Grid:")
-            display_grid(grid, cars, barriers)
 
-            # Check if the generated grid is winnable
-            if is_winning_state(grid_size, cars, barriers):
-                # Display the solution if winnable
-                display_solution(grid, cars, barriers, grid_size)
-            else:
-                print("This state is not winnable.")
+# docker build -t parking-jam-3d .
+# docker run -it --rm parking-jam-3d /bin/bash
 
-                
-    # Run the main function
-    main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
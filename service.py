@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+
+from batch import evaluate_board
+
+
+def board_key(board):
+    """
+    A key that is equal for boards with the same size, the same cars in the same order and
+    the same barriers in any order. The car order stays in the key because escape_order
+    ranks cars by their place in car_list, so it decides the order of the moves.
+    """
+    return json.dumps([board["size"], board["car_list"], sorted(json.dumps(barrier) for barrier in board["barrier_list"])])
+
+
+class SolverService:
+    def __init__(self, workers=2, timeout=30.0, use_sat=False):
+        """
+        Check boards asynchronously on a fixed number of worker processes.
+        Requests wait their turn for an idle worker, so no more than workers boards are
+        ever solved at once, and identical boards already in flight share one answer.
+        A request that is not answered within timeout seconds, waiting for a worker
+        included, raises asyncio.TimeoutError. If its board had reached a worker, that
+        worker is killed along with any kissat or dsharp process it started, and replaced.
+        """
+        self.command = [sys.executable, os.path.abspath(__file__), "--worker"]
+        self.workers = workers
+        self.timeout = timeout
+        self.use_sat = use_sat
+        self.idle = asyncio.Queue()
+        self.processes = set()
+        self.in_flight = {}
+        self.dispatched = 0
+
+    async def _spawn(self):
+        # Each worker leads its own process group so a timeout can take its solver children down too
+        process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            cwd=os.path.dirname(os.path.abspath(__file__)), start_new_session=True)
+        self.processes.add(process)
+        self.idle.put_nowait(process)
+
+    def _kill(self, process):
+        self.processes.discard(process)
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    async def start(self):
+        for _ in range(self.workers):
+            await self._spawn()
+        return self
+
+    async def close(self):
+        for process in list(self.processes):
+            self._kill(process)
+            await process.wait()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _dispatch(self, board):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        # Running out of time in the queue costs no worker
+        process = await asyncio.wait_for(self.idle.get(), self.timeout)
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            self.idle.put_nowait(process)
+            raise asyncio.TimeoutError()
+
+        self.dispatched += 1
+        try:
+            process.stdin.write((json.dumps({"board": board, "sat": self.use_sat}) + "\n").encode())
+            await process.stdin.drain()
+            line = await asyncio.wait_for(process.stdout.readline(), remaining)
+            if not line:
+                raise RuntimeError("Worker exited without an answer")
+        except BaseException:
+            # The worker may be halfway through a board, so it cannot be reused
+            self._kill(process)
+            await process.wait()
+            await self._spawn()
+            raise
+        self.idle.put_nowait(process)
+        return json.loads(line)
+
+    async def solve(self, board):
+        """
+        Check one board in the examples schema and return its batch.evaluate_board record.
+        Raises asyncio.TimeoutError when the board takes longer than the timeout and
+        ValueError when it is not a board object at all.
+        """
+        if not isinstance(board, dict) or not all(field in board for field in ("size", "car_list", "barrier_list")):
+            raise ValueError("A board needs size, car_list and barrier_list")
+        key = board_key(board)
+        if key not in self.in_flight:
+            task = asyncio.ensure_future(self._dispatch(board))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # Shield the shared task so one caller giving up does not cancel it for the others
+        return await asyncio.shield(self.in_flight[key])
+
+
+async def handle_client(service, reader, writer):
+    """
+    Answer one JSON board per line with one JSON record per line, in order.
+    """
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        try:
+            record = await service.solve(json.loads(line))
+        except asyncio.TimeoutError:
+            record = {"error": "timeout"}
+        except (ValueError, KeyError, TypeError, RuntimeError) as e:
+            record = {"error": str(e)}
+        writer.write((json.dumps(record) + "\n").encode())
+        await writer.drain()
+    writer.close()
+
+
+async def serve(host, port, workers, timeout, use_sat):
+    async with SolverService(workers, timeout, use_sat) as service:
+        server = await asyncio.start_server(lambda r, w: handle_client(service, r, w), host, port)
+        print(f"Serving on {host}:{port} with {workers} workers")
+        async with server:
+            await server.serve_forever()
+
+
+def worker():
+    """
+    Read {"board", "sat"} requests from stdin and write one record per line to stdout.
+    """
+    for line in sys.stdin:
+        request = json.loads(line)
+        board = request["board"]
+        try:
+            board["car_list"] = [tuple(car) for car in board["car_list"]]
+            board["barrier_list"] = [tuple(barrier) for barrier in board["barrier_list"]]
+            record = evaluate_board(None, board, use_sat=request["sat"])
+            del record["board"]
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            record = {"error": f"Bad board: {e}"}
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve parking jam board checks over TCP, one JSON board per line.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a board's worker is killed")
+    parser.add_argument("--sat", action="store_true", help="decide each board with the SAT theory")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker()
+    else:
+        asyncio.run(serve(args.host, args.port, args.workers, args.timeout, args.sat))
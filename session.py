@@ -0,0 +1,53 @@
+from nnf import Var
+
+import lib204
+from theory import BarrierAt, example_theory
+
+
+class SolverSession:
+    def __init__(self, grid_size, cars, barriers=(), compact=False):
+        """
+        A long-lived solver for one set of cars, for asking many what-if questions about barriers.
+        The game rules are compiled to a d-DNNF once with every BarrierAt left open, and each
+        query only fixes the barrier literals as assumptions on that circuit, so it costs one
+        pass over the circuit instead of a rebuild and a solver call.
+        """
+        self.grid_size = grid_size
+        self.covered = {cell for car in cars for cell in car.cells()}
+        self.barriers = {(barrier.x, barrier.y) for barrier in barriers}
+
+        self.theory = lib204.Encoding()
+        self.theory.add_constraint(example_theory(grid_size, cars, compact).compile())
+        # Only the barriers the rules mention need an assumption
+        names = self.theory.compile().vars()
+        self.cells = {(x, y) for x in range(grid_size) for y in range(grid_size) if BarrierAt(x, y) in names}
+
+    def _check(self, x, y):
+        if not (0 <= x < self.grid_size and 0 <= y < self.grid_size):
+            raise ValueError(f"({x}, {y}) is off the board")
+        if (x, y) in self.covered:
+            raise ValueError(f"({x}, {y}) is taken by a car")
+
+    def assumptions(self, add=(), remove=()):
+        """
+        The BarrierAt literals for the current barriers with the cells in add set
+        and the cells in remove cleared.
+        """
+        for x, y in add:
+            self._check(x, y)
+        barriers = (self.barriers | set(add)) - set(remove)
+        return [Var(BarrierAt(x, y), (x, y) in barriers) for x, y in sorted(self.cells)]
+
+    def satisfiable(self, add=(), remove=()):
+        """
+        Whether the board is winnable with the barriers in add added and those in remove taken
+        away. The session's own barriers stay as they are.
+        """
+        return self.theory.is_satisfiable_under(self.assumptions(add, remove))
+
+    def add_barrier(self, x, y):
+        self._check(x, y)
+        self.barriers.add((x, y))
+
+    def remove_barrier(self, x, y):
+        self.barriers.discard((x, y))
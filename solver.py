@@ -0,0 +1,107 @@
+import heapq
+
+
+def escape_order(board, order=None):
+    """
+    Work out the order in which cars leave the board without replaying it cell by cell.
+    Every car is checked once up front; after that, a car leaving only re-checks the
+    cars whose nearest obstacle it was (at most one per side of each cell it covered),
+    so the peel is linear in the number of cars.
+    Among the cars that can leave, the one earliest in order goes first, which is the
+    same move sequence display_solution produced by rescanning from the first car.
+    Returns (moves, stuck): moves is a list of (car_id, direction) and stuck holds the
+    ids of the cars that can never escape.
+    """
+    board = board.copy()
+    if order is None:
+        order = list(board.positions)
+    rank = {car_id: i for i, car_id in enumerate(order)}
+
+    ready = [(rank[car_id], car_id) for car_id in order if board.escape_direction(car_id)]
+    queued = {car_id for _, car_id in ready}
+    heapq.heapify(ready)
+
+    moves = []
+    while ready:
+        _, car_id = heapq.heappop(ready)
+        direction = board.escape_direction(car_id)
+        cells = board.span(car_id)
+        board.remove_car(car_id)
+        moves.append((car_id, direction))
+
+        # Only the cars that were waiting on the vacated cells need another look
+        for x, y in cells:
+            for other in board.waiting_on(x, y):
+                if other not in queued and board.escape_direction(other):
+                    queued.add(other)
+                    heapq.heappush(ready, (rank[other], other))
+
+    stuck = [car_id for car_id in order if car_id not in queued]
+    return moves, stuck
+
+
+def exit_waves(board):
+    """
+    Split the escape into waves of cars that can all leave at the same time.
+    Every car that can leave goes in the earliest wave it can, which gives the fewest waves
+    possible: a car leaving never blocks another, so holding one back never helps.
+    As in escape_order, only the cars waiting on the cells a wave vacated are looked at
+    again, so the whole search is linear in the number of cars.
+    Returns (waves, stuck): each wave is a list of (car_id, direction) sorted by id.
+    """
+    board = board.copy()
+    wave = sorted(car_id for car_id in board.positions if board.escape_direction(car_id))
+    queued = set(wave)
+
+    waves = []
+    while wave:
+        # Every car in the wave leaves from the board as it was at the start of the wave
+        moves = [(car_id, board.escape_direction(car_id)) for car_id in wave]
+        vacated = []
+        for car_id in wave:
+            vacated.extend(board.span(car_id))
+            board.remove_car(car_id)
+        waves.append(moves)
+
+        wave = []
+        for x, y in vacated:
+            for other in board.waiting_on(x, y):
+                if other not in queued and board.escape_direction(other):
+                    queued.add(other)
+                    wave.append(other)
+        wave.sort()
+
+    return waves, sorted(board.positions)
+
+
+def canonical_order(board):
+    """
+    The lexicographically smallest exit order by car id. Picking the smallest car that can
+    leave at each step is enough, since a car that can leave stays able to.
+    """
+    return escape_order(board, sorted(board.positions))
+
+
+def barrier_escapes(board):
+    """
+    For every car, whether its forward and backward paths are free of barriers.
+    Other cars are ignored, exactly like the escape constraints in example_theory.
+    """
+    return {car_id: (not board.barrier_ray(car_id, "forwards"), not board.barrier_ray(car_id, "backwards"))
+            for car_id in board.positions}
+
+
+def theory_verdict(board):
+    """
+    Decide whether board_theory is satisfiable straight from the barrier bitsets.
+    Every car needs a path with no barriers on it, and (as in example_theory) a car
+    is blocked outright when both of its paths consist only of barriers.
+    """
+    for car_id in board.positions:
+        forwards = board.barrier_ray(car_id, "forwards")
+        backwards = board.barrier_ray(car_id, "backwards")
+        if forwards and backwards:
+            return False
+        if forwards == board.ray_span(car_id, "forwards") and backwards == board.ray_span(car_id, "backwards"):
+            return False
+    return True
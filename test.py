@@ -1,20 +1,495 @@
 
-import os, sys
+import io, os, sys, pickle, json, subprocess, asyncio
 
-from run import example_theory
+from run import build_board, example_theory, board_theory, generate_set_board, generate_random_board, is_winning_state, display_solution
+from examples import examples
+from cache import TheoryCache, board_signature
+from nnf import Var
+import lib204
+from board import Board
+from solver import escape_order, theory_verdict, exit_waves, canonical_order
+from planning import plan_exits, PlanningTheory
+from session import SolverSession
+import batch, corpus
+from batch import load_boards, run_batch
+from corpus import write_corpus, read_corpus, CorpusReader
+from profiling import Profiler
+from service import SolverService, handle_client
+from heatmap import barrier_heatmap
+from editor import BoardEditor
+from layouts import LayoutCounter
+from decompose import components, escape_order_split, theory_verdict_split
+import vectorized
 
 USAGE = '\n\tpython3 test.py [draft|final]\n'
 EXPECTED_VAR_MIN = 10
 EXPECTED_CONS_MIN = 50
 
 def test_theory():
-    T = example_theory()
+    example = examples[0]
+    _, cars, _ = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+    T = example_theory(example["size"], cars).compile()
 
     assert len(T.vars()) > EXPECTED_VAR_MIN, "Only %d variables -- your theory is likely not sophisticated enough for the course project." % len(T.vars())
     assert T.size() > EXPECTED_CONS_MIN, "Only %d operators in the formula -- your theory is likely not sophisticated enough for the course project." % T.size()
     assert not T.valid(), "Theory is valid (every assignment is a solution). Something is likely wrong with the constraints."
     assert not T.negate().valid(), "Theory is inconsistent (no solutions exist). Something is likely wrong with the constraints."
 
+def test_board_escape():
+    B = Board(5)
+    B.place_car(1, 2, 2, 'EW')
+    B.place_car(2, 2, 0, 'NS')
+    B.place_barrier(0, 2)
+
+    assert B.escape_direction(1) == "forwards"
+    assert B.escape_direction(2) == "forwards"
+    B.place_barrier(4, 2)
+    assert B.escape_direction(1) is None
+    B.remove_car(1)
+    assert B.is_empty(2, 2)
+    assert B.escape_direction(2) == "forwards" and B.can_escape(2, "backwards")
+
+def test_escape_order():
+    B = Board(4)
+    B.place_car(1, 1, 1, 'EW')
+    B.place_car(2, 3, 1, 'NS')
+    B.place_car(3, 3, 0, 'EW')
+    B.place_barrier(0, 1)
+    B.place_barrier(3, 2)
+
+    # Car 1 waits for car 2, which waits for car 3
+    assert escape_order(B, [1, 2, 3]) == ([(3, "forwards"), (2, "forwards"), (1, "forwards")], [])
+    assert B.positions[1] == (1, 1), "Solving should not modify the board"
+
+    B.place_car(4, 2, 3, 'EW')
+    B.place_barrier(1, 3)
+    B.place_barrier(3, 3)
+    assert escape_order(B)[1] == [4]
+
+def test_board_theories_are_independent():
+    theories = []
+    for example in [examples[0], examples[5], examples[0]]:
+        _, cars, barriers = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+        theories.append(board_theory(example["size"], cars, barriers))
+
+    assert theories[0].compile().satisfiable()
+    assert not theories[1].compile().satisfiable()
+    assert len(theories[0]._custom_constraints) == len(theories[2]._custom_constraints)
+
+def test_fast_path_matches_theory():
+    for example in examples:
+        _, cars, barriers = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+        is_winning_state(example["size"], cars, barriers, verbose=False, cross_validate=True)
+
+def test_theory_cache():
+    example = examples[0]
+    n = example["size"]
+    _, cars, barriers = generate_set_board(n, example["car_list"], example["barrier_list"])
+
+    # Rotate the board a quarter turn, which turns EW cars into NS cars
+    swap = {'NS': 'EW', 'EW': 'NS'}
+    _, turned_cars, turned_barriers = generate_set_board(
+        n, [(i, n - 1 - y, x, swap[o]) for i, x, y, o in example["car_list"]],
+        [(n - 1 - y, x) for x, y in example["barrier_list"]])
+
+    assert board_signature(n, cars, barriers) != board_signature(n, turned_cars, turned_barriers)
+    assert board_signature(n, cars, barriers, symmetric=True) == board_signature(n, turned_cars, turned_barriers, symmetric=True)
+
+    C = TheoryCache()
+    assert C.satisfiable(n, cars, barriers)
+    assert C.satisfiable(n, turned_cars, turned_barriers)
+    assert len(C.theories) == 1, "The rotated board should reuse the cached verdict"
+
+def test_likelihoods():
+    a, b, c = Var('a'), Var('b'), Var('c')
+    T = lib204.Encoding()
+    T.add_constraint(a | b)
+    T.add_constraint(~a | c)
+
+    assert T.count_solutions() == 4
+    assert T.count_solutions([a]) == 2
+    assert T.likelihoods([a, ~b, c]) == [T.likelihood(a), T.likelihood(~b), T.likelihood(c)] == [0.5, 0.25, 0.75]
+
+def test_compiled_theory_cache(tmp_path):
+    a, b, c = Var('a'), Var('b'), Var('c')
+    first = lib204.Encoding(str(tmp_path))
+    first.add_constraint((a | b) & (~a | c))
+    second = lib204.Encoding(str(tmp_path))
+    second.add_constraint((~a | c) & (b | a))
+    assert first.key() == second.key()
+
+    assert first.count_solutions([b]) == 3
+    assert len(list(tmp_path.glob("*.nnf"))) == 1
+    assert second.likelihoods([a, b, c]) == first.likelihoods([a, b, c])
+
+    _, cars, _ = generate_set_board(4, [(1, 0, 1, 'EW'), (2, 2, 2, 'NS')], [])
+    heatmap = barrier_heatmap(4, cars, str(tmp_path))
+    assert heatmap[1][0] is None and heatmap[2][2] is None
+    assert all(0 <= value <= 1 for row in heatmap for value in row if value is not None)
+    assert barrier_heatmap(4, cars, str(tmp_path)) == heatmap == barrier_heatmap(4, cars)
+
+    # Processes compiling the same theory at once all get the right counts
+    shared = tmp_path / "shared"
+    script = ("import json, sys; from run import generate_set_board; from heatmap import barrier_heatmap; "
+              "_, cars, _ = generate_set_board(4, [(1, 0, 1, 'EW'), (2, 2, 2, 'NS')], []); "
+              "print(json.dumps(barrier_heatmap(4, cars, sys.argv[1])))")
+    processes = [subprocess.Popen([sys.executable, "-c", script, str(shared)], stdout=subprocess.PIPE, text=True)
+                 for _ in range(4)]
+    assert all(json.loads(process.communicate()[0]) == heatmap for process in processes)
+    assert sorted(path.suffix for path in shared.iterdir()) == [".cnf", ".json", ".nnf"]
+
+def test_random_board_modes():
+    for seed in range(20):
+        grid, cars, barriers = generate_random_board(8, 12, 10, seed=seed, require_winnable=True)
+        assert len(cars) == 12 and len(barriers) == 10
+        assert is_winning_state(8, cars, barriers, verbose=False) and not escape_order(grid)[1]
+
+        grid, cars, barriers = generate_random_board(8, 12, 10, seed=seed, require_unwinnable=True)
+        assert escape_order(grid)[1]
+
+    # Constructed winnable boards stay reachable up to dense layouts
+    for size, num_cars, num_barriers in [(50, 750, 0), (20, 200, 0), (20, 320, 20)]:
+        grid, cars, barriers = generate_random_board(size, num_cars, num_barriers, seed=1, require_winnable=True)
+        assert len(cars) == num_cars and not escape_order(grid)[1] and theory_verdict(grid)
+
+    # A full line next to open ones must not turn into a negative weight when any open cell may be picked
+    grid, cars, barriers = generate_random_board(2, 3, 1, seed=1124, require_winnable=True)
+    assert len(cars) == 3 and not escape_order(grid)[1]
+    for seed in range(300):
+        try:
+            grid, cars, barriers = generate_random_board(3, 4, 2, seed=seed, require_winnable=True)
+        except ValueError as e:
+            assert "way out" in str(e)
+            continue
+        assert not escape_order(grid)[1]
+
+    first = generate_random_board(10, 15, 15, seed=7)[0]
+    assert first.cells == generate_random_board(10, 15, 15, seed=7)[0].cells
+
+def test_solution_modes():
+    example = examples[0]
+    outputs = {}
+    for mode in ["full", "delta", "summary"]:
+        grid, cars, barriers = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+        out = io.StringIO()
+        display_solution(grid, cars, barriers, example["size"], out, mode)
+        outputs[mode] = out.getvalue()
+        assert not cars and not grid.positions
+
+    assert outputs["full"].count("Iteration") == outputs["delta"].count("Iteration") == 5
+    assert "Car 3 has exited forwards, (4, 5) 3NS -> ." in outputs["delta"]
+    assert outputs["summary"] == "5 cars escaped.\nAll cars have escaped! Winning state achieved.\n"
+
+def test_vectorized_matches_solver():
+    boards = [generate_random_board(8, 10 + seed % 15, 10, seed=seed)[0] for seed in range(40)]
+    grids, orientations = vectorized.stack_boards(boards)
+    forwards, backwards = vectorized.escapability(grids, orientations)
+    verdicts = vectorized.theory_verdicts(grids, orientations)
+    winnable, _ = vectorized.peel(grids, orientations)
+
+    for i, board in enumerate(boards):
+        for car_id, (x, y) in board.positions.items():
+            assert forwards[i, y, x] == board.can_escape(car_id, "forwards")
+            assert backwards[i, y, x] == board.can_escape(car_id, "backwards")
+        assert verdicts[i] == theory_verdict(board)
+        assert winnable[i] == (not escape_order(board)[1])
+
+def test_long_vehicles():
+    # A truck across the middle row and two cars parked above and below its cab
+    grid, cars, barriers = generate_set_board(6, [(1, 1, 2, 'EW', 3), (2, 3, 0, 'NS', 2), (3, 3, 3, 'NS')],
+                                              [(0, 2), (5, 2), (3, 5)])
+    assert grid.span(1) == [(1, 2), (2, 2), (3, 2)]
+    assert all(grid.at(x, y) == 1 for x, y in grid.span(1))
+    assert not grid.fits(2, 1, 'NS', 2)
+
+    # The truck is walled in, car 2 leaves upwards and car 3 has to wait for the truck
+    assert escape_order(grid, [1, 2, 3]) == ([(2, "forwards")], [1, 3])
+    assert not is_winning_state(6, cars, barriers, verbose=False, cross_validate=True)
+
+    grid, cars, barriers = generate_set_board(6, [(1, 1, 2, 'EW', 3), (2, 3, 0, 'NS', 2), (3, 3, 3, 'NS')],
+                                              [(0, 2), (3, 5)])
+    assert escape_order(grid, [1, 2, 3]) == ([(1, "forwards"), (2, "forwards"), (3, "forwards")], [])
+    assert is_winning_state(6, cars, barriers, verbose=False, cross_validate=True)
+
+def test_compact_encoding():
+    for seed in range(30):
+        _, cars, barriers = generate_random_board(6, 6, 4 + seed % 20, seed=seed)
+        full = board_theory(6, cars, barriers).compile()
+        compact = board_theory(6, cars, barriers, compact=True).compile()
+        assert full.satisfiable() == compact.satisfiable()
+
+    # A car on the edge with only barriers on its other side counts as blocked in both
+    _, cars, barriers = generate_set_board(3, [(1, 0, 1, 'EW')], [(1, 1), (2, 1)])
+    assert not board_theory(3, cars, barriers, compact=True).compile().satisfiable()
+
+def test_planning_encoding():
+    # Four cars in a pinwheel, each with a barrier on one side and the next car on the other
+    cars = [(1, 1, 1, 'EW'), (2, 2, 1, 'NS'), (3, 2, 2, 'EW'), (4, 1, 2, 'NS')]
+    grid, cars, barriers = generate_set_board(4, cars, [(0, 1), (2, 0), (3, 2), (1, 3)])
+    assert is_winning_state(4, cars, barriers, verbose=False)
+    assert plan_exits(4, cars, barriers) is None
+
+    # Opening car 2's way out lets the others follow one at a time
+    grid, cars, barriers = generate_set_board(4, [(car.car_id, car.x, car.y, car.orientation) for car in cars],
+                                              [(0, 1), (3, 2), (1, 3)])
+    moves, horizon = PlanningTheory(4, cars, barriers).plan()
+    assert moves == [(2, "forwards"), (1, "forwards"), (4, "forwards"), (3, "backwards")]
+    assert horizon == 4
+
+    for seed in range(10):
+        grid, cars, barriers = generate_random_board(5, 8, 4, seed=seed)
+        moves = plan_exits(5, cars, barriers)
+        assert (moves is not None) == (not escape_order(grid)[1])
+        for car_id, direction in moves or []:
+            assert grid.can_escape(car_id, direction)
+            grid.remove_car(car_id)
+
+def test_solver_session():
+    grid, cars, barriers = generate_set_board(4, [(1, 1, 1, 'EW'), (2, 2, 2, 'NS')], [(0, 1)])
+    S = SolverSession(4, cars, barriers)
+    assert S.satisfiable()
+    # Walling car 1 in on its right as well leaves it no way out
+    assert not S.satisfiable(add=[(2, 1), (3, 1)])
+    assert S.satisfiable(add=[(2, 1), (3, 1)], remove=[(0, 1)])
+    assert S.barriers == {(0, 1)}
+
+    S.add_barrier(2, 0)
+    S.add_barrier(2, 3)
+    assert not S.satisfiable()
+    S.remove_barrier(2, 0)
+    assert S.satisfiable()
+
+    try:
+        S.add_barrier(2, 2)
+        assert False, "A barrier cannot go on a car"
+    except ValueError:
+        pass
+
+def test_board_records():
+    grid, cars, barriers = generate_random_board(8, 10, 6, seed=3)
+    grid2, cars2, barriers2 = pickle.loads(pickle.dumps((grid, cars, barriers)))
+    assert cars2 == cars and barriers2 == barriers
+    assert grid2.cells == grid.cells and escape_order(grid2) == escape_order(grid)
+    assert repr(cars[0]).startswith(f"Car({cars[0].car_id}, x = ")
+
+def test_run_batch(tmp_path):
+    path = tmp_path / "boards.jsonl"
+    with open(path, "w") as f:
+        for example in examples:
+            f.write(json.dumps(example) + "\n")
+
+    # load_boards spots corpus files by their magic bytes without importing corpus.py
+    assert batch.CORPUS_MAGIC == corpus.MAGIC
+    records = list(run_batch(load_boards(path), workers=2))
+    assert [record["board"] for record in records] == list(range(len(examples)))
+    for record, example in zip(records, examples):
+        grid, cars, _ = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+        moves, stuck = escape_order(grid, [car.car_id for car in cars])
+        assert record["moves"] == (moves if not stuck else [])
+        assert record["winnable"] == (not stuck and theory_verdict(grid))
+
+def test_corpus_round_trip(tmp_path):
+    path = str(tmp_path / "examples.pjam")
+    assert write_corpus(path, examples) == len(examples)
+    for original, loaded in zip(examples, read_corpus(path)):
+        # Barriers placed on a car are dropped on the way in, as generate_set_board does
+        _, _, barriers = generate_set_board(original["size"], original["car_list"], original["barrier_list"])
+        assert loaded["size"] == original["size"]
+        assert loaded["car_list"] == original["car_list"]
+        assert sorted(loaded["barrier_list"]) == sorted((barrier.x, barrier.y) for barrier in barriers)
+
+    boards = []
+    for seed in range(10):
+        _, cars, barriers = generate_random_board(8, 10, 6, seed=seed)
+        boards.append({"size": 8, "car_list": [(car.car_id, car.x, car.y, car.orientation) for car in cars],
+                       "barrier_list": [(barrier.x, barrier.y) for barrier in barriers]})
+    write_corpus(path, boards)
+    with CorpusReader(path) as reader:
+        assert reader.cells(0).shape == (8, 8)
+        winnable, _ = vectorized.peel(*reader.stack())
+    for i, board in enumerate(boards):
+        grid, _, _ = generate_set_board(8, board["car_list"], board["barrier_list"])
+        assert winnable[i] == (not escape_order(grid)[1])
+
+def test_exit_waves():
+    # Car 1 waits for car 2, which waits for car 3; car 4 is free from the start
+    grid, _, _ = generate_set_board(5, [(1, 1, 2, 'EW'), (2, 3, 2, 'NS'), (3, 3, 4, 'EW'), (4, 0, 0, 'NS')],
+                                    [(0, 2), (3, 1), (2, 4)])
+    waves, stuck = exit_waves(grid)
+    assert waves == [[(3, "forwards"), (4, "forwards")], [(2, "backwards")], [(1, "forwards")]]
+    assert stuck == []
+    assert canonical_order(grid)[0] == [(3, "forwards"), (2, "backwards"), (1, "forwards"), (4, "forwards")]
+
+    boards = [generate_random_board(8, 20, 8, seed=seed)[0] for seed in range(30)]
+    winnable, rounds = vectorized.peel(*vectorized.stack_boards(boards))
+    for i, board in enumerate(boards):
+        waves, stuck = exit_waves(board)
+        assert len(waves) == rounds[i] and (not stuck) == winnable[i]
+        assert sorted([car_id for wave in waves for car_id, _ in wave] + stuck) == sorted(board.positions)
+
+def test_profiler():
+    example = examples[0]
+    grid, cars, barriers = generate_set_board(example["size"], example["car_list"], example["barrier_list"])
+    with Profiler() as profiler:
+        assert is_winning_state(example["size"], cars, barriers, verbose=False, use_sat=True)
+        display_solution(grid, cars, barriers, example["size"], out=io.StringIO(), mode="summary")
+    record = profiler.record()
+    assert {"board_theory", "compile", "kissat", "escape_order", "display_solution"} <= set(record["seconds"])
+    assert record["counters"]["moves"] == len(example["car_list"])
+    assert record["counters"]["constraints"] > 0 and record["counters"]["cnf_clauses"] > 0
+
+    # Nothing is collected once the profiler is closed
+    is_winning_state(example["size"], cars, barriers, verbose=False, use_sat=True)
+    assert profiler.record() == record
+
+def test_cli_defers_solver_stack(tmp_path):
+    script = "import run, sys; run.main(['--example', '2', '--format', 'json']); print('bauhaus' in sys.modules)"
+    lines = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout.splitlines()
+    record = json.loads(lines[0])
+    assert record["winnable"] and record["stuck"] == [] and len(record["moves"]) == len(examples[1]["car_list"])
+    assert lines[1] == "False"
+
+    script = "import run, sys; run.main(['--example', '6', '--sat', '--format', 'summary']); print('bauhaus' in sys.modules)"
+    lines = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout.splitlines()
+    assert lines == ["This state is not winnable.", "True"]
+
+    # A board from a JSONL file needs neither the examples nor NumPy
+    path = tmp_path / "boards.jsonl"
+    path.write_text(json.dumps(examples[0]) + "\n")
+    script = ("import run, sys; run.main(['--board', sys.argv[1], '--format', 'summary']); "
+              "print([name for name in ('examples', 'corpus', 'numpy', 'bauhaus') if name in sys.modules])")
+    lines = subprocess.run([sys.executable, "-c", script, str(path)], capture_output=True, text=True, check=True).stdout.splitlines()
+    assert lines[-1] == "[]"
+
+def test_solver_service():
+    async def scenario():
+        async with SolverService(workers=2, timeout=30) as service:
+            records = await asyncio.gather(*(service.solve(board) for board in examples * 3))
+            assert [record["winnable"] for record in records] == ([True] * 5 + [False] * 4) * 3
+            assert service.dispatched <= len(examples) * 3
+
+            assert len(service.processes) == 2
+
+            # The same cars listed in another order are a different request with their own move order
+            reordered = dict(examples[0], car_list=examples[0]["car_list"][::-1])
+            first, second = await asyncio.gather(service.solve(examples[0]), service.solve(reordered))
+            assert [move[0] for move in first["moves"]] != [move[0] for move in second["moves"]]
+
+            # Lines that are not boards come back as error records and the connection keeps going
+            server = await asyncio.start_server(lambda r, w: handle_client(service, r, w), "127.0.0.1", 0)
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            bad = dict(examples[0], car_list=[[1, 0, 0, "EW"], "x", 3])
+            for line in ["[1, 2]", "not json", json.dumps(bad), json.dumps(examples[0])]:
+                writer.write((line + "\n").encode())
+            replies = [json.loads(await reader.readline()) for _ in range(4)]
+            assert all("error" in reply for reply in replies[:3])
+            assert replies[3]["winnable"]
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+
+    # A worker that never answers is killed with its children once the deadline passes, and
+    # a request queued behind it runs out of time without waiting for it
+    sleeper = "import subprocess, sys, time; subprocess.Popen(['sleep', '60']); sys.stdin.readline(); time.sleep(60)"
+
+    def live_group_members(pgid):
+        # Killed children can linger as zombies until init reaps them, so only count live ones
+        members = []
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[2]) == pgid and fields[0] != "Z":
+                members.append(pid)
+        return members
+
+    async def overrun():
+        service = SolverService(workers=1, timeout=0.5)
+        service.command = [sys.executable, "-c", sleeper]
+        async with service:
+            (old,) = service.processes
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = await asyncio.gather(service.solve(examples[0]), service.solve(examples[1]),
+                                           return_exceptions=True)
+            assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+            assert loop.time() - start < 0.9
+
+            (new,) = service.processes
+            assert new is not old and new.returncode is None
+            for _ in range(50):
+                if not live_group_members(old.pid):
+                    break
+                await asyncio.sleep(0.02)
+            else:
+                assert False, "The timed-out worker's process group is still running"
+
+    asyncio.run(overrun())
+
+def test_board_editor():
+    _, cars, barriers = generate_random_board(8, 10, 6, seed=3)
+    editor = BoardEditor(8, cars, barriers)
+
+    def check():
+        grid = build_board(8, editor.cars, editor.barriers)
+        assert editor.solution() == escape_order(grid)
+        assert editor.winnable() == (not escape_order(grid)[1])
+        assert sorted(editor.movable()) == sorted(c for c in grid.positions if grid.escape_direction(c))
+
+    check()
+    for x, y in [(0, 0), (7, 7), (3, 4)]:
+        if editor.board.is_empty(x, y):
+            editor.add_barrier(x, y)
+            check()
+            editor.remove_barrier(x, y)
+            check()
+    editor.add_car(50, *next((x, y) for y in range(8) for x in range(8) if editor.board.is_empty(x, y)), 'NS')
+    check()
+    car = editor.cars[0]
+    try:
+        editor.move_car(car.car_id, -1, 0)
+        assert False, "Moved a car off the board"
+    except ValueError:
+        assert editor.car(car.car_id) == car
+    editor.remove_car(50)
+    check()
+
+def test_decomposition():
+    # Two cars on separate lines that never cross, and a pair that block each other
+    grid = Board(6)
+    grid.place_car(1, 0, 0, 'EW', 2)
+    grid.place_car(2, 4, 5, 'NS')
+    grid.place_car(3, 4, 2, 'EW')
+    grid.place_car(4, 3, 3, 'NS')
+    grid.place_barrier(5, 3)
+    groups = sorted(sorted(car_ids) for car_ids, _ in components(grid))
+    assert groups == [[1], [2, 3], [4]]
+
+    for seed in range(20):
+        _, cars, barriers = generate_random_board(8, 12, 8, seed=seed)
+        grid = build_board(8, cars, barriers)
+        order = sorted(grid.positions, reverse=True)
+        assert escape_order_split(grid, order) == escape_order(grid, order)
+        assert theory_verdict_split(8, cars, barriers) == theory_verdict(grid)
+
+def test_layout_counter():
+    from itertools import combinations
+    from board import Barrier
+    for seed in range(5):
+        _, cars, _ = generate_random_board(4, 5, 0, seed=seed)
+        counter = LayoutCounter(4, cars)
+        empty = [(x, y) for y in range(4) for x in range(4) if build_board(4, cars, []).is_empty(x, y)]
+        for k in range(5):
+            # Every placement checked by peeling the board it makes
+            winnable = [list(cells) for cells in combinations(empty, k)
+                        if not escape_order(build_board(4, cars, [Barrier(x, y) for x, y in cells]))[1]]
+            assert counter.count(k) == len(winnable)
+            assert sorted(counter.layouts(k)) == sorted(winnable)
+
 def file_checks(stage):
     proofs_jp = os.path.isfile(os.path.join('.','documents',stage,'proofs.jp'))
     modelling_report_docx = os.path.isfile(os.path.join('.','documents',stage,'modelling_report.docx'))
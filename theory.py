@@ -0,0 +1,321 @@
+from functools import lru_cache
+
+from bauhaus import Encoding, proposition, constraint, And, Or
+from nnf import config
+
+import profiling
+from profiling import span, count, spanned
+
+config.sat_backend = "kissat"
+
+
+
+# E only holds the proposition registry; every board gets its own encoding from new_encoding()
+E = Encoding()
+
+
+# Define Propositions
+@proposition(E)
+class Orientation:
+    def __init__(self, car_id, direction):
+        """
+        Represents the orientation of a car.
+        direction: 'NS' for North/South or 'EW' for East/West
+        N is always forwards for NS cars, E is forwards for EW Cars
+        """
+        self.car_id = car_id
+        self.direction = direction
+
+    def _prop_name(self):
+        return f"Orientation({self.car_id},{self.direction})"
+
+
+@proposition(E)
+class CarAt:
+    def __init__(self, x, y):
+        """
+        Represents whether a car is at a specific location (x, y).
+        """
+        self.x = x
+        self.y = y
+
+    def _prop_name(self):
+        return f"CarAt({self.x},{self.y})"
+
+
+@proposition(E)
+class BarrierAt:
+    def __init__(self, x, y):
+        """
+        Represents whether a barrier is at a specific location (x, y).
+        """
+        self.x = x
+        self.y = y
+
+    def _prop_name(self):
+        return f"BarrierAt({self.x},{self.y})"
+
+
+
+@proposition(E)
+class Empty:
+    def __init__(self, x, y):
+        """
+        Represents whether a location (x, y) is empty.
+        """
+        self.x = x
+        self.y = y
+
+    def _prop_name(self):
+        return f"Empty({self.x},{self.y})"
+
+
+@proposition(E)
+class EscapeForwards:
+    def __init__(self, car_id):
+        """
+        Represents whether a car can escape forwards.
+        """
+        self.car_id = car_id
+
+    def _prop_name(self):
+        return f"EscapeForwards({self.car_id})"
+
+
+@proposition(E)
+class EscapeBackwards:
+    def __init__(self, car_id):
+        """
+        Represents whether a car can escape backwards.
+        """
+        self.car_id = car_id
+
+    def _prop_name(self):
+        return f"EscapeBackwards({self.car_id})"
+
+
+@proposition(E)
+class RayClear:
+    def __init__(self, x, y, direction):
+        """
+        Represents that there is no barrier from (x, y) to the edge of the grid heading in direction.
+        direction: 'N', 'S', 'E' or 'W'. Only used by the compact encoding.
+        """
+        self.x = x
+        self.y = y
+        self.direction = direction
+
+    def _prop_name(self):
+        return f"RayClear({self.x},{self.y},{self.direction})"
+    
+
+    
+
+
+# Build an example full theory for your setting and return it.
+#
+#  There should be at least 10 variables, and a sufficiently large formula to describe it (>50 operators).
+#  This restriction is fairly minimal, and if there is any concern, reach out to the teaching staff to clarify
+#  what the expectations are.
+
+
+def new_encoding():
+    """
+    Create an empty encoding for a single board.
+    It shares the proposition registry of E but keeps its own constraints,
+    so checking one board never adds to the theory of the next.
+    """
+    T = Encoding()
+    T.propositions = E.propositions
+    return T
+
+
+@lru_cache(maxsize=32)
+def empty_constraints(grid_size):
+    """
+    The per-cell Empty implications only depend on grid_size, so they are built
+    once and shared by every board of that size.
+    """
+    return tuple(Empty(x, y) >> (~CarAt(x, y) & ~BarrierAt(x, y))
+                 for x in range(grid_size) for y in range(grid_size))
+
+
+STEPS = {'N': (0, -1), 'S': (0, 1), 'E': (1, 0), 'W': (-1, 0)}
+
+
+def compact_rules(T, grid_size, cars):
+    """
+    Add the game rules to T in the compact encoding and return the cells they mention.
+    RayClear(x, y, d) is defined once per cell from the variable of the next cell along d,
+    so cars sharing a row or column share one chain and the theory grows linearly.
+    Empty and the car facts are left out because no constraint reads them. The barrier-only
+    blocked check is kept only for cars with an empty path on one side, the one case where
+    it changes the verdict.
+    """
+    defined = set()
+    used = set()
+
+    def chain(x, y, d):
+        # Define RayClear from (x, y) to the edge, stopping where another ray already did
+        dx, dy = STEPS[d]
+        while (x, y, d) not in defined:
+            defined.add((x, y, d))
+            used.add((x, y))
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < grid_size and 0 <= ny < grid_size:
+                T.add_constraint(RayClear(x, y, d) >> (~BarrierAt(x, y) & RayClear(nx, ny, d)))
+            else:
+                T.add_constraint(RayClear(x, y, d) >> ~BarrierAt(x, y))
+                break
+            x, y = nx, ny
+
+    for car in cars:
+        end = (car.x if car.orientation == 'EW' else car.y) + car.length - 1
+        if car.orientation == 'EW':
+            paths = [(EscapeForwards, end + 1, car.y, 'E', grid_size - 1 - end),
+                     (EscapeBackwards, car.x - 1, car.y, 'W', car.x)]
+        else:
+            paths = [(EscapeForwards, car.x, car.y - 1, 'N', car.y),
+                     (EscapeBackwards, car.x, end + 1, 'S', grid_size - 1 - end)]
+
+        for escape, x, y, d, length in paths:
+            if length:
+                T.add_constraint(escape(car.car_id) >> RayClear(x, y, d))
+                chain(x, y, d)
+
+        # A car on the edge is still blocked when the whole of its other path is barriers
+        if not paths[0][4] or not paths[1][4]:
+            _, x, y, d, length = paths[1] if not paths[0][4] else paths[0]
+            dx, dy = STEPS[d]
+            cells = [(x + i * dx, y + i * dy) for i in range(length)]
+            used.update(cells)
+            stuck = ~EscapeForwards(car.car_id) & ~EscapeBackwards(car.car_id)
+            T.add_constraint(And([BarrierAt(cx, cy) for cx, cy in cells]) >> stuck if cells else stuck)
+
+    # Define a winning state: All cars can escape
+    T.add_constraint(And([EscapeForwards(car.car_id) | EscapeBackwards(car.car_id) for car in cars]))
+    return used
+
+
+@spanned("example_theory")
+def example_theory(grid_size, cars, compact=False):
+    """
+    Define the constraints for the parking jam game, ensuring that the board state
+    determines if all cars can escape or if any car is completely blocked.
+    Returns a fresh encoding holding only this board's constraints.
+    With compact set, the rules use the smaller encoding from compact_rules instead.
+    """
+    T = new_encoding()
+    if compact:
+        compact_rules(T, grid_size, cars)
+        return T
+
+    # Constraint: A cell is empty if it contains neither a car nor a barrier
+    for c in empty_constraints(grid_size):
+        T.add_constraint(c)
+
+
+    # loop through cars list and add constraints for each one
+    for car in cars:
+        # Rays start beyond the last cell of the car's span
+        end = (car.x if car.orientation == 'EW' else car.y) + car.length - 1
+
+        if car.orientation == 'EW':
+            # Escape constraints for EW cars
+            escape_right = And([~BarrierAt(end + i, car.y) for i in range(1, grid_size - end)])
+            escape_left = And([~BarrierAt(car.x - i, car.y) for i in range(1, car.x + 1)])
+            
+            T.add_constraint(EscapeForwards(car.car_id) >> escape_right)
+            T.add_constraint(EscapeBackwards(car.car_id) >> escape_left)
+
+            # Fully blocked state for EW cars
+            barriers_left = And([BarrierAt(car.x - i, car.y) for i in range(1, car.x + 1)])
+            barriers_right = And([BarrierAt(end + i, car.y) for i in range(1, grid_size - end)])
+            
+            fully_blocked_by_barriers = And(barriers_left, barriers_right)
+            T.add_constraint(fully_blocked_by_barriers >> ~EscapeForwards(car.car_id))
+            T.add_constraint(fully_blocked_by_barriers >> ~EscapeBackwards(car.car_id))
+
+        elif car.orientation == 'NS':
+            # Escape constraints for NS cars
+            escape_up = And([~BarrierAt(car.x, car.y - i) for i in range(1, car.y + 1)])
+            escape_down = And([~BarrierAt(car.x, end + i) for i in range(1, grid_size - end)])
+            
+            T.add_constraint(EscapeForwards(car.car_id) >> escape_up)
+            T.add_constraint(EscapeBackwards(car.car_id) >> escape_down)
+
+            # Fully blocked state for NS cars
+            barriers_up = And([BarrierAt(car.x, car.y - i) for i in range(1, car.y + 1)])
+            barriers_down = And([BarrierAt(car.x, end + i) for i in range(1, grid_size - end)])
+            
+            fully_blocked_by_barriers = And(barriers_up, barriers_down)
+            T.add_constraint(fully_blocked_by_barriers >> ~EscapeForwards(car.car_id))
+            T.add_constraint(fully_blocked_by_barriers >> ~EscapeBackwards(car.car_id))
+
+    # Define a winning state: All cars can escape
+    all_cars_escape = And([EscapeForwards(car.car_id) | EscapeBackwards(car.car_id) for car in cars])
+
+    # Define a losing state: Any car is blocked on both sides by barriers
+    any_car_blocked = Or([And([
+        And([BarrierAt(car.x - i, car.y) for i in range(1, car.x + 1)]),
+        And([BarrierAt(car.x + car.length - 1 + i, car.y) for i in range(1, grid_size - car.x - car.length + 1)])
+    ]) if car.orientation == "EW" else And([
+        And([BarrierAt(car.x, car.y - i) for i in range(1, car.y + 1)]),
+        And([BarrierAt(car.x, car.y + car.length - 1 + i) for i in range(1, grid_size - car.y - car.length + 1)])
+    ]) for car in cars])
+
+    T.add_constraint(all_cars_escape)
+    T.add_constraint(~any_car_blocked)
+
+    return T
+
+
+@spanned("board_theory")
+def board_theory(grid_size, cars, barriers, compact=False):
+    """
+    Build the theory for one board: the game rules plus the positions of its cars and barriers.
+    The compact encoding only states the barriers that its rules mention.
+    """
+    if compact:
+        T = new_encoding()
+        used = compact_rules(T, grid_size, cars)
+        for barrier in barriers:
+            if (barrier.x, barrier.y) in used:
+                T.add_constraint(BarrierAt(barrier.x, barrier.y))
+        count("constraints", len(T._custom_constraints))
+        return T
+
+    T = example_theory(grid_size, cars)
+
+    # Add the cells covered by each car and its orientation to the encoding
+    for car in cars:
+        for x, y in car.cells():
+            T.add_constraint(CarAt(x, y))
+        T.add_constraint(Orientation(car.car_id, car.orientation))
+
+    # Add the barrier positions to the encoding
+    for barrier in barriers:
+        T.add_constraint(BarrierAt(barrier.x, barrier.y))
+
+    count("constraints", len(T._custom_constraints))
+    return T
+
+
+def solve_theory(grid_size, cars, barriers, compact=False):
+    """
+    Compile and solve the board's theory. Returns (satisfiable, model).
+    """
+    # Compile constraints
+    T = board_theory(grid_size, cars, barriers, compact)
+    with span("compile"):
+        T = T.compile()
+    if profiling.active is not None:
+        # kissat converts the theory to CNF itself; converting it again here is only paid when profiling
+        count("nnf_size", T.size())
+        count("cnf_clauses", len(T.to_CNF().children))
+
+    # Check satisfiability
+    with span("kissat"):
+        if T.satisfiable():
+            return True, T.solve()
+    return False, None
@@ -0,0 +1,155 @@
+import numpy as np
+
+
+def stack_boards(boards):
+    """
+    Stack Board objects into an (N, S, S) cell array using the board encoding
+    (0 empty, -1 barrier, car id) and an (N, K + 1) table holding 1 for every NS car id.
+    Cells are int8 whenever the car ids fit.
+    """
+    size = boards[0].size
+    max_id = max((max(board.positions, default=0) for board in boards), default=0)
+    dtype = np.int8 if max_id <= np.iinfo(np.int8).max else np.int32
+
+    grids = np.array([board.cells for board in boards], dtype=dtype).reshape(len(boards), size, size)
+    orientations = np.zeros((len(boards), max_id + 1), dtype=np.int8)
+    for i, board in enumerate(boards):
+        for car_id, orientation in board.orientations.items():
+            if orientation == 'NS':
+                orientations[i, car_id] = 1
+    return grids, orientations
+
+
+def _shift(acc, axis, edge):
+    """
+    Turn an inclusive running result along axis into one that excludes the cell itself.
+    """
+    out = np.full_like(acc, edge)
+    target = [slice(None)] * acc.ndim
+    source = [slice(None)] * acc.ndim
+    target[axis] = slice(1, None)
+    source[axis] = slice(None, -1)
+    out[tuple(target)] = acc[tuple(source)]
+    return out
+
+
+def _any_before(mask, axis):
+    return _shift(np.logical_or.accumulate(mask, axis=axis), axis, False)
+
+
+def _any_after(mask, axis):
+    return np.flip(_any_before(np.flip(mask, axis), axis), axis)
+
+
+def _all_before(mask, axis):
+    return _shift(np.logical_and.accumulate(mask, axis=axis), axis, True)
+
+
+def _all_after(mask, axis):
+    return np.flip(_all_before(np.flip(mask, axis), axis), axis)
+
+
+def _is_ns(grids, orientations):
+    ids = np.where(grids > 0, grids, 0)
+    return (orientations[np.arange(len(grids))[:, None, None], ids] == 1) & (grids > 0)
+
+
+def _same_before(grids, axis):
+    """
+    Whether the previous cell along axis belongs to the same car.
+    """
+    same = _shift(grids, axis, 0) == grids
+    return same & (grids > 0)
+
+
+def _same_after(grids, axis):
+    return np.flip(_same_before(np.flip(grids, axis), axis), axis)
+
+
+def _ends(grids, ns):
+    """
+    The front and back cell of every car: the top or right end of its span is its front.
+    Single-cell cars are both.
+    """
+    front = np.where(ns, ~_same_before(grids, 1), ~_same_after(grids, 2))
+    back = np.where(ns, ~_same_after(grids, 1), ~_same_before(grids, 2))
+    cars = grids > 0
+    return cars & front, cars & back
+
+
+def _per_car(grids, mask, width):
+    """
+    Collect a cell mask into an (N, width) table indexed by car id.
+    """
+    table = np.zeros((len(grids), width), dtype=bool)
+    boards = np.broadcast_to(np.arange(len(grids))[:, None, None], grids.shape)
+    table[boards[mask], grids[mask]] = True
+    return table
+
+
+def _along(ns, ew_forwards, ew_backwards, ns_forwards, ns_backwards):
+    """
+    Pick each car's forward and backward values. N is forwards for NS cars, E for EW cars.
+    """
+    return np.where(ns, ns_forwards, ew_forwards), np.where(ns, ns_backwards, ew_backwards)
+
+
+def escapability(grids, orientations, barriers_only=False):
+    """
+    Whether every car in every board can leave forwards and backwards right now.
+    Returns two (N, S, S) boolean arrays: forwards is reported on each car's front cell
+    and backwards on its back cell, which is the same cell for single-cell cars.
+    With barriers_only set, other cars are ignored, as in example_theory.
+    """
+    occupied = grids < 0 if barriers_only else grids != 0
+    ns = _is_ns(grids, orientations)
+    front, back = _ends(grids, ns)
+
+    # Axis 1 runs down the columns (y) and axis 2 along the rows (x)
+    forwards, backwards = _along(ns,
+                                 ~_any_after(occupied, 2), ~_any_before(occupied, 2),
+                                 ~_any_before(occupied, 1), ~_any_after(occupied, 1))
+    return front & forwards, back & backwards
+
+
+def theory_verdicts(grids, orientations):
+    """
+    Decide board_theory satisfiability for every board at once, like solver.theory_verdict.
+    """
+    width = orientations.shape[1]
+    barriers = grids < 0
+    ns = _is_ns(grids, orientations)
+    front, back = _ends(grids, ns)
+
+    forwards, backwards = escapability(grids, orientations, barriers_only=True)
+    walled_forwards, walled_backwards = _along(ns,
+                                               _all_after(barriers, 2), _all_before(barriers, 2),
+                                               _all_before(barriers, 1), _all_after(barriers, 1))
+
+    # A car's two paths start at different cells once it is longer than one cell
+    present = _per_car(grids, grids > 0, width)
+    free = _per_car(grids, forwards | backwards, width)
+    walled = _per_car(grids, front & walled_forwards, width) & _per_car(grids, back & walled_backwards, width)
+    return np.all(~present | (free & ~walled), axis=1)
+
+
+def peel(grids, orientations):
+    """
+    Remove every car that can leave, in rounds, until no board changes.
+    All cars that can leave together do so in the same round, which is safe because a
+    car leaving never blocks another. Returns (winnable, rounds) as (N,) arrays.
+    """
+    grids = grids.copy()
+    rounds = np.zeros(len(grids), dtype=np.int64)
+    while True:
+        forwards, backwards = escapability(grids, orientations)
+        leaving = _per_car(grids, forwards | backwards, orientations.shape[1])
+        leaving[:, 0] = False
+        active = leaving.any(axis=1)
+        if not active.any():
+            break
+        rounds += active
+        # Clear every cell of the leaving cars, not just the end they drove out of
+        ids = np.where(grids > 0, grids, 0)
+        grids[leaving[np.arange(len(grids))[:, None, None], ids]] = 0
+    return ~(grids > 0).any(axis=(1, 2)), rounds